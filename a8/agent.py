@@ -1,9 +1,12 @@
 # agent.py
 
 import asyncio
-import yaml
 from core.loop import AgentLoop
 from core.session import MultiMCP
+from modules.config import get_config
+from modules.memory import close_shared_memory
+from modules.model_router import get_router
+from modules.rate_limit import limiter_stats
 
 def log(stage: str, msg: str):
     """Simple timestamped console logger."""
@@ -16,10 +19,8 @@ async def main():
     print("🧠 Cortex-R Agent Ready")
     user_input = input("🧑 What do you want to solve today? → ")
 
-    # Load MCP server configs from profiles.yaml
-    with open("config/profiles.yaml", "r") as f:
-        profile = yaml.safe_load(f)
-        mcp_servers = profile.get("mcp_servers", [])
+    # Load MCP server configs from profiles.yaml (shared, parsed once per process)
+    mcp_servers = get_config().profile.get("mcp_servers", [])
 
     multi_mcp = MultiMCP(server_configs=mcp_servers)
     print("Agent before initialize")
@@ -38,6 +39,13 @@ async def main():
         log("fatal", f"Agent failed: {e}")
         raise
 
+    finally:
+        log("mcp", f"Server queue metrics: {multi_mcp.get_metrics()}")
+        log("llm", f"Response cache: {get_router().cache_stats() or 'disabled'}")
+        log("llm", f"Rate limiter queueing: {limiter_stats()}")
+        await multi_mcp.shutdown()
+        close_shared_memory()
+
 
 if __name__ == "__main__":
     asyncio.run(main())
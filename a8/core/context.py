@@ -13,6 +13,8 @@
 
 # modules/memory.py (for memory operations)
 
+# modules/usage.py (per-session LLM token / latency / cost accounting)
+
 # config/profiles.yaml
 
 # Inputs: User query + session_id
@@ -21,23 +23,41 @@
 
 # core/context.py
 
+import asyncio
 from typing import List, Optional, Dict, Any
-from modules.memory import MemoryManager, MemoryItem
+from modules.memory import MemoryManager, MemoryItem, get_shared_memory
+from modules.config import get_config
+from modules.usage import UsageTracker
 from pathlib import Path
 import yaml
 import time
 import uuid
 
 class AgentProfile:
-    def __init__(self, config_path: str = "config/profiles.yaml"):
-        with open(config_path, "r") as f:
-            config = yaml.safe_load(f)
+    def __init__(self, config_path: Optional[str] = None):
+        if config_path is None:
+            # Shared, already-parsed profile (hot-reloaded on change) instead of re-reading per session
+            config = get_config().profile
+        else:
+            with open(config_path, "r") as f:
+                config = yaml.safe_load(f)
 
         self.name = config["agent"]["name"]
         self.id = config["agent"]["id"]
         self.description = config["agent"]["description"]
         self.strategy = config["strategy"]["type"]
+        self.mode = config["strategy"].get("mode", "layered")
+        self.perception_refresh = config["strategy"].get("perception_refresh", "on_change")
         self.max_steps = config["strategy"]["max_steps"]
+        self.max_parallel_calls = config["strategy"].get("max_parallel_calls", 1)
+        self.explore_width = config["strategy"].get("explore_width", 3)
+        self.retry_concurrent = config["strategy"].get("retry_concurrent", False)
+        if self.mode == "fused":
+            # One fused call per step: perception is always fresh and there is a single candidate plan
+            if self.strategy == "explore_all":
+                print("[agent] ⚠️ strategy.type explore_all is ignored in fused mode (one plan per step)")
+            if "perception_refresh" in config["strategy"]:
+                print("[agent] ⚠️ strategy.perception_refresh is ignored in fused mode (perception runs every step)")
 
         self.memory_config = config["memory"]
         self.llm_config = config["llm"]
@@ -58,21 +78,32 @@ class AgentContext:
         self.agent_profile = profile or AgentProfile()
         self.session_id = f"session-{int(time.time())}-{uuid.uuid4().hex[:6]}"
         self.step = 0
-        self.memory = MemoryManager(
-            embedding_model_url=self.agent_profile.memory_config["embedding_url"],
-            model_name=self.agent_profile.memory_config["embedding_model"]
-        )
+        if self.agent_profile.memory_config.get("store_path"):
+            # Durable memory shared by every session on the node
+            self.memory = get_shared_memory(self.agent_profile.memory_config)
+        else:
+            self.memory = MemoryManager(
+                embedding_model_url=self.agent_profile.memory_config["embedding_url"],
+                model_name=self.agent_profile.memory_config["embedding_model"],
+                batch_url=self.agent_profile.memory_config.get("embedding_batch_url"),
+                batch_size=self.agent_profile.memory_config.get("embed_batch_size", 32),
+                max_concurrency=self.agent_profile.memory_config.get("embed_concurrency", 4),
+                exact_filter_limit=self.agent_profile.memory_config.get("exact_filter_limit", 4096),
+                index_config=self.agent_profile.memory_config.get("index"),
+            )
         self.memory_trace: List[MemoryItem] = []
         self.tool_calls: List[ToolCallTrace] = []
         self.final_answer: Optional[str] = None
+        self.usage = UsageTracker()
 
     def add_tool_trace(self, name: str, args: Dict[str, Any], result: Any):
         trace = ToolCallTrace(name, args, result)
         self.tool_calls.append(trace)
 
-    def add_memory(self, item: MemoryItem):
+    async def add_memory(self, item: MemoryItem):
         self.memory_trace.append(item)
-        self.memory.add(item)
+        # Embedding request + FAISS add block; run them off the event loop
+        await asyncio.to_thread(self.memory.add, item)
 
     def __repr__(self):
         return f"<AgentContext step={self.step}, session_id={self.session_id}>"
@@ -3,10 +3,12 @@
 import asyncio
 from core.context import AgentContext
 from core.session import MultiMCP
-from core.strategy import decide_next_action
-from modules.perception import extract_perception, PerceptionResult
-from modules.action import ToolCallResult, parse_function_call
+from core.strategy import decide_next_action, decide_fused
+from modules.perception import extract_perception, PerceptionResult, perception_is_stale, carry_perception
+from modules.action import ToolCallResult, parse_function_call, parse_function_calls
 from modules.memory import MemoryItem
+from modules.tools import summarize_tools
+from modules.usage import set_tracker, reset_tracker
 import json
 
 from logging import Logger
@@ -15,7 +17,7 @@ logger = Logger(__name__)
 
 import json
 import ast
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, List, Optional
 
 def log(tag: str, message: str) -> None:
     """Helper function for logging."""
@@ -26,6 +28,8 @@ class AgentLoop:
         self.context = AgentContext(user_input)
         self.mcp = dispatcher
         self.tools = dispatcher.get_all_tools()
+        # The tool list is fixed for the task, so its prompt summary is built once, not per step
+        self.tool_summary = summarize_tools(self.tools)
 
     def tool_expects_input(self, tool_name: str) -> bool:
         tool = next((t for t in self.tools if getattr(t, "name", None) == tool_name), None)
@@ -34,80 +38,146 @@ class AgentLoop:
         parameters = getattr(tool, "parameters", {})
         return list(parameters.keys()) == ["input"]
 
-    
+    async def execute_tool(self, tool_name: str, arguments: Any) -> str:
+        """Runs one tool call through the dispatcher and returns its result as text."""
+        if self.tool_expects_input(tool_name):
+            tool_input = {'input': arguments} if not (isinstance(arguments, dict) and 'input' in arguments) else arguments
+        else:
+            tool_input = arguments
+
+        response = await self.mcp.call_tool(tool_name, tool_input)
+
+        if getattr(response, "isError", False):
+            # ⏱️ Timed-out / failed calls come back as structured errors; let the planner react
+            error_text = " ".join(getattr(c, "text", str(c)) for c in response.content)
+            print(f"[action] {tool_name} failed → {error_text}")
+            return f"ERROR: {error_text}"
+
+        # ✅ Safe TextContent parsing
+        raw = getattr(response.content, 'text', str(response.content))
+        try:
+            result_obj = json.loads(raw) if raw.strip().startswith("{") else raw
+        except json.JSONDecodeError:
+            result_obj = raw
+
+        result_str = result_obj.get("markdown") if isinstance(result_obj, dict) else str(result_obj)
+        print(f"[action] {tool_name} → {result_str}")
+        return result_str
+
+    async def perceive(self, query: str) -> Optional[PerceptionResult]:
+        """Layered mode: runs the perception LLM call; None means the session should stop."""
+        perception_raw = await extract_perception(query)
+
+
+        # ✅ Exit cleanly on FINAL_ANSWER
+        # ✅ Handle string outputs safely before trying to parse
+        if isinstance(perception_raw, str):
+            pr_str = perception_raw.strip()
+
+            # Clean exit if it's a FINAL_ANSWER
+            if pr_str.startswith("FINAL_ANSWER:"):
+                self.context.final_answer = pr_str
+                return None
+
+            # Detect LLM echoing the prompt
+            if "Your last tool produced this result" in pr_str or "Original user task:" in pr_str:
+                print("\n\n[perception] ⚠️ LLM likely echoed prompt. No actionable plan.")
+                self.context.final_answer = "FINAL_ANSWER: [no result]"
+                return None
+
+            # Try to decode stringified JSON if it looks valid
+            try:
+                perception_raw = json.loads(pr_str)
+            except json.JSONDecodeError:
+                print("\n\n[perception] ⚠️ LLM response was neither valid JSON nor actionable text.")
+                self.context.final_answer = "FINAL_ANSWER: [no result]"
+                return None
+
+
+        # ✅ Try parsing PerceptionResult
+        if isinstance(perception_raw, PerceptionResult):
+            perception = perception_raw
+        else:
+            try:
+                # Attempt to parse stringified JSON if needed
+                if isinstance(perception_raw, str):
+                    perception_raw = json.loads(perception_raw)
+                perception = PerceptionResult(**perception_raw)
+            except Exception as e:
+                print(f"\n\n[perception] ⚠️ LLM perception failed: {e}")
+                print(f"\n\n[perception] Raw output: {perception_raw}")
+                return None
+
+        return perception
+
+    async def retrieve_memory(self, query: str) -> List[MemoryItem]:
+        """Runs the (blocking) embedding + FAISS lookup in a worker thread so it can overlap with LLM calls."""
+        retrieved = await asyncio.to_thread(
+            self.context.memory.retrieve,
+            query=query,
+            top_k=self.context.agent_profile.memory_config["top_k"],
+            type_filter=self.context.agent_profile.memory_config.get("type_filter", None),
+            session_filter=self.context.session_id
+        )
+        print(f"\n\n[memory] Retrieved {len(retrieved)} memories\n Retrived Memory: {retrieved}")
+        return retrieved
 
     async def run(self) -> str:
         print(f"\n\n[agent] Starting session: {self.context.session_id}")
+        usage_token = set_tracker(self.context.usage)
 
         try:
             max_steps = self.context.agent_profile.max_steps
             query = self.context.user_input
+            perception: Optional[PerceptionResult] = None
+            results = []
+            refresh_always = self.context.agent_profile.perception_refresh == "always"
 
             for step in range(max_steps):
                 self.context.step = step
+                self.context.usage.step = step
                 print(f"\n\n[loop] Step {step + 1} of {max_steps}")
 
-                # 🧠 Perception
-                perception_raw = await extract_perception(query)
-
-
-                # ✅ Exit cleanly on FINAL_ANSWER
-                # ✅ Handle string outputs safely before trying to parse
-                if isinstance(perception_raw, str):
-                    pr_str = perception_raw.strip()
-                    
-                    # Clean exit if it's a FINAL_ANSWER
-                    if pr_str.startswith("FINAL_ANSWER:"):
-                        self.context.final_answer = pr_str
-                        break
-
-                    # Detect LLM echoing the prompt
-                    if "Your last tool produced this result" in pr_str or "Original user task:" in pr_str:
-                        print("\n\n[perception] ⚠️ LLM likely echoed prompt. No actionable plan.")
-                        self.context.final_answer = "FINAL_ANSWER: [no result]"
-                        break
-
-                    # Try to decode stringified JSON if it looks valid
-                    try:
-                        perception_raw = json.loads(pr_str)
-                    except json.JSONDecodeError:
-                        print("\n\n[perception] ⚠️ LLM response was neither valid JSON nor actionable text.")
-                        self.context.final_answer = "FINAL_ANSWER: [no result]"
-                        break
-
-
-                # ✅ Try parsing PerceptionResult
-                if isinstance(perception_raw, PerceptionResult):
-                    perception = perception_raw
+                if self.context.agent_profile.mode == "fused":
+                    # 🧠📊 Perception + planning in a single LLM call
+                    retrieved = await self.retrieve_memory(query)
+                    perception, plan = await decide_fused(
+                        context=self.context,
+                        query=query,
+                        memory_items=retrieved,
+                        all_tools=self.tools,
+                        tool_summary=self.tool_summary
+                    )
+                    print(f"\n\n[perception] Intent: {perception.intent}, Hint: {perception.tool_hint}")
                 else:
-                    try:
-                        # Attempt to parse stringified JSON if needed
-                        if isinstance(perception_raw, str):
-                            perception_raw = json.loads(perception_raw)
-                        perception = PerceptionResult(**perception_raw)
-                    except Exception as e:
-                        print(f"\n\n[perception] ⚠️ LLM perception failed: {e}")
-                        print(f"\n\n[perception] Raw output: {perception_raw}")
-                        break
-
-                print(f"\n\n[perception] Intent: {perception.intent}, Hint: {perception.tool_hint}")
-
-                # 💾 Memory Retrieval
-                retrieved = self.context.memory.retrieve(
-                    query=query,
-                    top_k=self.context.agent_profile.memory_config["top_k"],
-                    type_filter=self.context.agent_profile.memory_config.get("type_filter", None),
-                    session_filter=self.context.session_id
-                )
-                print(f"\n\n[memory] Retrieved {len(retrieved)} memories\n Retrived Memory: {retrieved}")
-
-                # 📊 Planning (via strategy)
-                plan = await decide_next_action(
-                    context=self.context,
-                    perception=perception,
-                    memory_items=retrieved,
-                    all_tools=self.tools
-                )
+                    # 💾 Memory Retrieval — depends only on the query, so it overlaps with perception
+                    memory_task = asyncio.create_task(self.retrieve_memory(query))
+
+                    # 🧠 Perception (once per task; refreshed only when the last results suggest a change of direction)
+                    if refresh_always or perception_is_stale(perception, results):
+                        try:
+                            perception = await self.perceive(query)
+                        except BaseException:
+                            memory_task.cancel()
+                            raise
+                        if perception is None:
+                            memory_task.cancel()
+                            break
+                        print(f"\n\n[perception] Intent: {perception.intent}, Hint: {perception.tool_hint}")
+                    else:
+                        perception = carry_perception(perception, query, results)
+                        print(f"\n\n[perception] Reusing intent: {perception.intent}, Hint: {perception.tool_hint}")
+
+                    retrieved = await memory_task
+
+                    # 📊 Planning (via strategy)
+                    plan = await decide_next_action(
+                        context=self.context,
+                        perception=perception,
+                        memory_items=retrieved,
+                        all_tools=self.tools,
+                        tool_summary=self.tool_summary
+                    )
                 print(f"\n\n[plan] {plan}")
 
                 if "FINAL_ANSWER:" in plan:
@@ -120,44 +190,49 @@ class AgentLoop:
                     break
 
 
-                # ⚙️ Tool Execution
+                # ⚙️ Tool Execution (independent calls from one plan run concurrently)
                 try:
-                    tool_name, arguments = parse_function_call(plan)
-
-                    if self.tool_expects_input(tool_name):
-                        tool_input = {'input': arguments} if not (isinstance(arguments, dict) and 'input' in arguments) else arguments
-                    else:
-                        tool_input = arguments
-
-                    response = await self.mcp.call_tool(tool_name, tool_input)
-
-                    # ✅ Safe TextContent parsing
-                    raw = getattr(response.content, 'text', str(response.content))
-                    try:
-                        result_obj = json.loads(raw) if raw.strip().startswith("{") else raw
-                    except json.JSONDecodeError:
-                        result_obj = raw
+                    calls = parse_function_calls(plan)
+                    outcomes = await asyncio.gather(
+                        *(self.execute_tool(tool_name, arguments) for tool_name, arguments in calls),
+                        return_exceptions=True
+                    )
 
-                    result_str = result_obj.get("markdown") if isinstance(result_obj, dict) else str(result_obj)
-                    print(f"[action] {tool_name} → {result_str}")
+                    results = []
+                    for (tool_name, arguments), outcome in zip(calls, outcomes):
+                        if isinstance(outcome, BaseException):
+                            if len(calls) == 1:
+                                raise outcome
+                            print(f"[error] {tool_name} failed: {outcome}")
+                            outcome = f"ERROR: {outcome}"
+                        results.append((tool_name, arguments, outcome))
+
+                    if len(results) > 1 and all(str(r).startswith("ERROR:") for _, _, r in results):
+                        print("[error] All parallel tool calls failed")
+                        break
 
                     # 🧠 Add memory
-                    memory_item = MemoryItem(
-                        text=f"{tool_name}({arguments}) → {result_str}",
-                        type="tool_output",
-                        tool_name=tool_name,
-                        user_query=query,
-                        tags=[tool_name],
-                        session_id=self.context.session_id
-                    )
-                    self.context.add_memory(memory_item)
+                    for tool_name, arguments, result_str in results:
+                        memory_item = MemoryItem(
+                            text=f"{tool_name}({arguments}) → {result_str}",
+                            type="tool_output",
+                            tool_name=tool_name,
+                            user_query=query,
+                            tags=[tool_name],
+                            session_id=self.context.session_id
+                        )
+                        await self.context.add_memory(memory_item)
 
                     # 🔁 Next query
-                    query = f"""Original user task: {self.context.user_input}
+                    if len(results) == 1:
+                        result_block = f"Your last tool produced this result:\n\n    {results[0][2]}"
+                    else:
+                        lines = "\n".join(f"    - {name}({args}) → {res}" for name, args, res in results)
+                        result_block = f"Your last tools produced these results:\n\n{lines}"
 
-    Your last tool produced this result:
+                    query = f"""Original user task: {self.context.user_input}
 
-    {result_str}
+    {result_block}
 
     If this fully answers the task, return:
     FINAL_ANSWER: your answer
@@ -169,6 +244,12 @@ class AgentLoop:
 
         except Exception as e:
             print(f"[agent] Session failed: {e}")
+        finally:
+            reset_tracker(usage_token)
+            usage = self.context.usage.summary()
+            log("usage", f"Session totals: {json.dumps(usage['total'])}")
+            for role, totals in usage["by_role"].items():
+                log("usage", f"  {role}: {json.dumps(totals)}")
 
         return self.context.final_answer or "FINAL_ANSWER: [no result]"
 
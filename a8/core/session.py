@@ -2,9 +2,17 @@
 
 import os
 import sys
-from typing import Optional, Any, List, Dict
-from mcp import ClientSession, StdioServerParameters
+import json
+import asyncio
+import hashlib
+import time
+import anyio
+from pathlib import Path
+from typing import Optional, Any, List, Dict, Set
+from mcp import ClientSession, StdioServerParameters, Tool
+from mcp.types import CallToolResult, TextContent
 from mcp.client.stdio import stdio_client
+from mcp.shared.exceptions import McpError
 
 
 class MCP:
@@ -47,61 +55,604 @@ class MCP:
                 return await session.call_tool(tool_name, arguments=arguments)
 
 
+class ToolTimeoutError(Exception):
+    """Raised when a tool call exceeds its configured deadline."""
+
+    def __init__(self, tool_name: str, timeout: float, message: Optional[str] = None):
+        super().__init__(message or f"Tool '{tool_name}' timed out after {timeout:g}s")
+        self.tool_name = tool_name
+        self.timeout = timeout
+
+
+class ServerStartTimeoutError(ToolTimeoutError):
+    """Raised when a tool call gives up waiting for its server to (re)start."""
+
+    def __init__(self, tool_name: str, script: str, timeout: float):
+        super().__init__(tool_name, timeout, f"MCP server {script} did not start within {timeout:g}s (needed for '{tool_name}')")
+
+
+class ServerConnection:
+    """
+    One long-lived MCP stdio session.
+    The subprocess and ClientSession are owned by a background task so that the
+    anyio scopes opened by stdio_client are entered and exited in the same task.
+    """
+
+    def __init__(self, params: StdioServerParameters):
+        self.params = params
+        self.session: Optional[ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._error: Optional[BaseException] = None
+        self._broken = False
+        self.in_flight = 0  # calls running on this session
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def alive(self) -> bool:
+        return (
+            not self._broken
+            and self.session is not None
+            and self._task is not None
+            and not self._task.done()
+        )
+
+    def mark_broken(self):
+        self._broken = True
+
+    async def start(self):
+        self._ready.clear()
+        self._stop.clear()
+        self._error = None
+        self._broken = False
+        self._task = asyncio.create_task(self._run())
+        await self._ready.wait()
+        if not self.alive:
+            raise RuntimeError(f"Failed to start MCP server {self.params.args}: {self._error}")
+
+    async def _run(self):
+        try:
+            async with stdio_client(self.params) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._ready.set()
+                    await self._stop.wait()
+        except BaseException as e:
+            self._error = e
+        finally:
+            self.session = None
+            self._ready.set()
+
+    async def list_tools(self) -> List[Any]:
+        tools_result = await self.session.list_tools()
+        return tools_result.tools
+
+    async def call_tool(self, tool_name: str, arguments: dict) -> Any:
+        self.in_flight += 1
+        self._idle.clear()
+        try:
+            return await self.session.call_tool(tool_name, arguments)
+        finally:
+            self.in_flight -= 1
+            if not self.in_flight:
+                self._idle.set()
+
+    async def close_when_idle(self):
+        """Closes the session once the calls still running on it have finished (each has its own deadline)."""
+        await self._idle.wait()
+        await self.close()
+
+    async def close(self):
+        if self._task is None:
+            return
+        self._stop.set()
+        if self.session is None:
+            # Still starting up (or hung during initialize) — nothing to drain.
+            self._task.cancel()
+        try:
+            await self._task
+        except BaseException:
+            pass
+        self._task = None
+
+
+class QueueMetrics:
+    """Queue depth and wait-time counters for one server's request queue."""
+
+    def __init__(self):
+        self.calls = 0
+        self.queued = 0  # calls that had to wait for a free slot
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def enter_queue(self):
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+    def leave_queue(self, waited: float):
+        self.queue_depth -= 1
+        self.calls += 1
+        if waited > 0.001:
+            self.queued += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "queued": self.queued,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "avg_wait": self.total_wait / self.calls if self.calls else 0.0,
+            "max_wait": self.max_wait,
+        }
+
+
+class ServerPool:
+    """
+    Keeps `pool_size` initialized sessions alive for one server config.
+    Sessions are launched on first use and can be reaped once idle.
+    At most `max_in_flight` calls run against the server at once; the rest
+    wait in a FIFO queue, so a burst on one server never affects another.
+    Calls are spread round-robin; a session that died is restarted, and the
+    call is retried once if it never reached the old server.
+    Each call runs under a deadline (`call_timeout`, or a per-tool entry in
+    `tool_timeouts`); on expiry the request is cancelled and, unless
+    `restart_on_timeout` is false, the session is replaced so a runaway
+    tool cannot keep the server busy: new calls go to a fresh session while
+    the old one is closed only after its other in-flight calls finish.
+    Launching or restarting a session on the call path is bounded by
+    `startup_timeout`; a server that hangs at boot is abandoned in the
+    background and the call fails with a timeout instead of blocking.
+    """
+
+    DEFAULT_CALL_TIMEOUT = 60.0  # seconds; override per server with `call_timeout`
+    DEFAULT_MAX_IN_FLIGHT = 4  # override per server with `max_in_flight`
+    DEFAULT_IDLE_TIMEOUT = 300.0  # seconds; override per server with `idle_timeout` (0 = never reap)
+    DEFAULT_STARTUP_TIMEOUT = 30.0  # seconds; override per server with `startup_timeout`
+
+    # Raised when writing to a dead server: the request was never delivered.
+    UNSENT_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError)
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.pool_size = max(1, int(config.get("pool_size") or 1))
+        self.params = StdioServerParameters(
+            command=sys.executable,
+            args=[config["script"]],
+            cwd=config.get("cwd") or os.getcwd()
+        )
+        idle_timeout = config.get("idle_timeout")
+        self.idle_timeout: Optional[float] = (
+            float(idle_timeout) if idle_timeout is not None else self.DEFAULT_IDLE_TIMEOUT
+        )
+        self.call_timeout = float(config.get("call_timeout") or self.DEFAULT_CALL_TIMEOUT)
+        self.startup_timeout = float(config.get("startup_timeout") or self.DEFAULT_STARTUP_TIMEOUT)
+        self.tool_timeouts: Dict[str, float] = {
+            name: float(t) for name, t in (config.get("tool_timeouts") or {}).items()
+        }
+        self.restart_on_timeout = bool(config.get("restart_on_timeout", True))
+        self.max_in_flight = max(1, int(config.get("max_in_flight") or self.DEFAULT_MAX_IN_FLIGHT))
+        self._slots = asyncio.Semaphore(self.max_in_flight)  # asyncio wakes waiters in FIFO order
+        self.metrics = QueueMetrics()
+        self.connections: List[ServerConnection] = []
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+        self._next = 0
+        self._lock = asyncio.Lock()
+        self._background: set = set()
+        self._retired: Set[ServerConnection] = set()  # replaced after a timeout, closed once idle
+
+    @property
+    def running(self) -> bool:
+        return bool(self.connections)
+
+    async def start(self):
+        self.last_used = time.monotonic()
+        async with self._lock:
+            missing = self.pool_size - len(self.connections)
+            if missing <= 0:
+                return
+            new_conns = [ServerConnection(self.params) for _ in range(missing)]
+            try:
+                await asyncio.gather(*(conn.start() for conn in new_conns))
+            except BaseException:
+                for conn in new_conns:
+                    await conn.close()
+                raise
+            self.connections.extend(new_conns)
+            print(f"🚀 Started MCP server {self.config['script']} ({len(self.connections)} session(s))")
+
+    async def _acquire(self, tool_name: str) -> ServerConnection:
+        if len(self.connections) < self.pool_size:
+            await self._start_within_deadline(self.start(), tool_name)
+        conn = self.connections[self._next % len(self.connections)]
+        self._next += 1
+        if not conn.alive:
+            await self._start_within_deadline(self._restart(conn), tool_name, conn)
+        return conn
+
+    async def _start_within_deadline(self, starting, tool_name: str, conn: Optional[ServerConnection] = None):
+        """
+        Awaits a start/restart for at most startup_timeout. Not wait_for: that would wait for
+        the cancelled start to unwind (stopping the process); the stuck start is abandoned in
+        the background instead, so the caller is never held past the deadline.
+        """
+        task = asyncio.ensure_future(starting)
+        try:
+            done, _ = await asyncio.wait({task}, timeout=self.startup_timeout)
+        except asyncio.CancelledError:
+            self._in_background(self._abandon_start(task, conn))
+            raise
+        if done:
+            return task.result()
+        print(f"❌ Timed out after {self.startup_timeout:g}s starting MCP server {self.config['script']}")
+        self._in_background(self._abandon_start(task, conn))
+        raise ServerStartTimeoutError(tool_name, self.config["script"], self.startup_timeout)
+
+    @staticmethod
+    async def _abandon_start(task: asyncio.Task, conn: Optional[ServerConnection]):
+        task.cancel()
+        try:
+            await task
+        except BaseException:
+            pass
+        if conn is not None:
+            await conn.close()  # a cancelled start() closes its own new connections
+
+    def _in_background(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+
+    def _background_done(self, task: asyncio.Task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"⚠️ Background work for MCP server {self.config['script']} failed: {task.exception()}")
+
+    async def _restart(self, conn: ServerConnection):
+        async with self._lock:
+            if conn.alive:
+                return
+            print(f"🔁 Restarting MCP server {self.config['script']}")
+            await conn.close()
+            await conn.start()
+
+    async def list_tools(self) -> List[Any]:
+        self.in_flight += 1
+        try:
+            conn = await self._acquire("list_tools")
+            return await conn.list_tools()
+        finally:
+            self.in_flight -= 1
+            self.last_used = time.monotonic()
+
+    async def call_tool(self, tool_name: str, arguments: dict) -> Any:
+        # Counted before any await so the idle reaper never closes a pool
+        # that a caller is about to use.
+        self.in_flight += 1
+        try:
+            self.metrics.enter_queue()
+            queued_at = time.monotonic()
+            try:
+                await self._slots.acquire()
+            finally:
+                self.metrics.leave_queue(time.monotonic() - queued_at)
+            try:
+                return await self._call_tool(tool_name, arguments)
+            finally:
+                self._slots.release()
+        finally:
+            self.in_flight -= 1
+            self.last_used = time.monotonic()
+
+    def timeout_for(self, tool_name: str) -> float:
+        return self.tool_timeouts.get(tool_name, self.call_timeout)
+
+    async def _call_tool(self, tool_name: str, arguments: dict) -> Any:
+        conn = await self._acquire(tool_name)
+        try:
+            return await self._call_with_deadline(conn, tool_name, arguments)
+        except ToolTimeoutError:
+            raise
+        except Exception as e:
+            if not self._is_connection_error(e):
+                raise
+            print(f"⚠️ MCP session for {self.config['script']} lost ({e!r}), reconnecting...")
+            conn.mark_broken()
+            await self._start_within_deadline(self._restart(conn), tool_name, conn)
+            if isinstance(e, self.UNSENT_ERRORS):
+                return await self._call_with_deadline(conn, tool_name, arguments)
+            raise
+
+    async def _call_with_deadline(self, conn: ServerConnection, tool_name: str, arguments: dict) -> Any:
+        timeout = self.timeout_for(tool_name)
+        try:
+            return await asyncio.wait_for(conn.call_tool(tool_name, arguments), timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"⏱️ {tool_name} on {self.config['script']} timed out after {timeout:g}s")
+            if self.restart_on_timeout:
+                self._retire(conn)
+            raise ToolTimeoutError(tool_name, timeout) from None
+
+    def _retire(self, conn: ServerConnection):
+        """
+        Swaps `conn` for a fresh session (launched by the next call that picks it) and closes
+        the old one in the background once sibling calls on it are done, so they are not
+        killed along with the runaway one. The caller gets its timeout result immediately.
+        """
+        if conn in self.connections:
+            self.connections[self.connections.index(conn)] = ServerConnection(self.params)
+        self._retired.add(conn)
+        self._in_background(self._close_retired(conn))
+
+    async def _close_retired(self, conn: ServerConnection):
+        try:
+            await conn.close_when_idle()
+        finally:
+            self._retired.discard(conn)
+
+    def _is_connection_error(self, e: Exception) -> bool:
+        if isinstance(e, self.UNSENT_ERRORS + (anyio.EndOfStream,)):
+            return True
+        return isinstance(e, McpError) and "connection closed" in str(e).lower()
+
+    def is_idle(self, now: float) -> bool:
+        return (
+            self.running
+            and self.in_flight == 0
+            and bool(self.idle_timeout)
+            and now - self.last_used >= self.idle_timeout
+        )
+
+    async def reap_if_idle(self) -> bool:
+        async with self._lock:
+            if not self.is_idle(time.monotonic()):
+                return False
+            print(f"💤 Stopping idle MCP server {self.config['script']}")
+            await self._close_connections()
+            return True
+
+    async def close(self):
+        for conn in list(self._retired):
+            await conn.close()  # shutting down: do not wait for its remaining calls
+        while self._background:
+            # Abandoned starts and pending restarts finish (or are stopped) before the pool closes
+            await asyncio.gather(*self._background, return_exceptions=True)
+        async with self._lock:
+            await self._close_connections()
+
+    async def _close_connections(self):
+        for conn in self.connections:
+            await conn.close()
+        self.connections = []
+
+
+class ToolCatalogCache:
+    """
+    On-disk cache of each server's tool list (name, description, input schema).
+    Entries are keyed by server and invalidated when the fingerprint of the
+    server script (contents + mtime + interpreter) changes.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+    def load(self):
+        try:
+            self.entries = json.loads(self.path.read_text()).get("servers", {})
+        except FileNotFoundError:
+            self.entries = {}
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable tool catalog cache {self.path}: {e}")
+            self.entries = {}
+
+    def save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"servers": self.entries}, indent=2))
+            tmp.replace(self.path)
+        except Exception as e:
+            print(f"⚠️ Could not write tool catalog cache {self.path}: {e}")
+
+    @staticmethod
+    def fingerprint(params: StdioServerParameters) -> Optional[str]:
+        script = Path(params.cwd or os.getcwd()) / params.args[0]
+        try:
+            stat = script.stat()
+            digest = hashlib.sha256(script.read_bytes()).hexdigest()
+        except OSError:
+            return None
+        return f"{params.command}|{stat.st_mtime_ns}|{digest}"
+
+    def get(self, key: str, fingerprint: Optional[str]) -> Optional[List[Tool]]:
+        entry = self.entries.get(key)
+        if not entry or fingerprint is None or entry.get("fingerprint") != fingerprint:
+            return None
+        try:
+            return [Tool.model_validate(t) for t in entry["tools"]]
+        except Exception:
+            return None
+
+    def put(self, key: str, fingerprint: Optional[str], tools: List[Any]):
+        if fingerprint is None:
+            return
+        self.entries[key] = {
+            "fingerprint": fingerprint,
+            "tools": [t.model_dump(mode="json", exclude_none=True) for t in tools],
+        }
+
+
 class MultiMCP:
     """
-    Stateless version: discovers tools from multiple MCP servers, but reconnects per tool call.
-    Each call_tool() uses a fresh session based on tool-to-server mapping.
+    Discovers tools from multiple MCP servers and keeps a pool of live sessions
+    per server, so tool calls reuse an initialized session instead of
+    spawning a fresh subprocess each time.
+
+    Discovered tools are cached on disk; servers whose script is unchanged are
+    not launched at startup, only on their first tool call. Servers left idle
+    for longer than their `idle_timeout` are stopped and relaunched on demand.
     """
 
-    def __init__(self, server_configs: List[dict]):
+    DEFAULT_CACHE_PATH = Path(__file__).parent.parent / "cache" / "tool_catalog.json"
+
+    def __init__(
+        self,
+        server_configs: List[dict],
+        cache_path: Optional[Path] = None,
+        use_cache: bool = True,
+    ):
         self.server_configs = server_configs
         self.tool_map: Dict[str, Dict[str, Any]] = {}  # tool_name → {config, tool}
+        self.pools: Dict[tuple, ServerPool] = {}  # (script, cwd) → ServerPool
+        self.catalog = ToolCatalogCache(cache_path or self.DEFAULT_CACHE_PATH) if use_cache else None
+        self._reaper: Optional[asyncio.Task] = None
+        self._closing: Set[asyncio.Task] = set()  # stuck servers being stopped off the startup path
+
+    @staticmethod
+    def _pool_key(config: dict) -> tuple:
+        return (config["script"], config.get("cwd") or os.getcwd())
+
+    def _get_pool(self, config: dict) -> ServerPool:
+        key = self._pool_key(config)
+        if key not in self.pools:
+            self.pools[key] = ServerPool(config)
+        return self.pools[key]
 
     async def initialize(self):
+        """
+        Loads cached tool lists for unchanged servers and scans the rest
+        concurrently; each scan gets its own startup timeout so a slow or hung
+        server does not delay or block discovery on the others.
+        """
         print("in MultiMCP initialize")
-        for config in self.server_configs:
-            try:
-                params = StdioServerParameters(
-                    command=sys.executable,
-                    args=[config["script"]],
-                    cwd=config.get("cwd", os.getcwd())
-                )
-                print(f"→ Scanning tools from: {config['script']} in {params.cwd}")
-                async with stdio_client(params) as (read, write):
-                    print("Connection established, creating session...")
-                    try:
-                        async with ClientSession(read, write) as session:
-                            print("[agent] Session created, initializing...")
-                            await session.initialize()
-                            print("[agent] MCP session initialized")
-                            tools = await session.list_tools()
-                            print(f"→ Tools received: {[tool.name for tool in tools.tools]}")
-                            for tool in tools.tools:
-                                self.tool_map[tool.name] = {
-                                    "config": config,
-                                    "tool": tool
-                                }
-                    except Exception as se:
-                        print(f"❌ Session error: {se}")
-            except Exception as e:
-                print(f"❌ Error initializing MCP server {config['script']}: {e}")
+        if self.catalog:
+            self.catalog.load()
+
+        results: List[List[Any]] = [[] for _ in self.server_configs]
+        to_scan = []
+        for i, config in enumerate(self.server_configs):
+            cached = self._cached_tools(config)
+            if cached is not None:
+                print(f"→ Loaded {len(cached)} cached tools for {config['script']}")
+                results[i] = cached
+            else:
+                to_scan.append(i)
+
+        scanned = await asyncio.gather(
+            *(self._discover(self.server_configs[i]) for i in to_scan)
+        )
+        for i, tools in zip(to_scan, scanned):
+            results[i] = tools
+            if tools and self.catalog:
+                config = self.server_configs[i]
+                fingerprint = self.catalog.fingerprint(self._get_pool(config).params)
+                self.catalog.put(self._cache_key(config), fingerprint, tools)
+        if to_scan and self.catalog:
+            self.catalog.save()
+
+        for config, tools in zip(self.server_configs, results):
+            for tool in tools:
+                self.tool_map[tool.name] = {
+                    "config": config,
+                    "tool": tool
+                }
+
+        self._start_reaper()
+
+    def _start_reaper(self):
+        timeouts = [pool.idle_timeout for pool in self.pools.values() if pool.idle_timeout]
+        if not timeouts or self._reaper is not None:
+            return
+        interval = max(1.0, min(min(timeouts) / 2, 30.0))
+        self._reaper = asyncio.create_task(self._reap_idle(interval))
+
+    async def _reap_idle(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            for pool in list(self.pools.values()):
+                try:
+                    await pool.reap_if_idle()
+                except Exception as e:
+                    print(f"⚠️ Failed to stop idle MCP server {pool.config['script']}: {e}")
+
+    def _cache_key(self, config: dict) -> str:
+        script, cwd = self._pool_key(config)
+        return f"{cwd}|{script}"
+
+    def _cached_tools(self, config: dict) -> Optional[List[Any]]:
+        if not self.catalog:
+            return None
+        pool = self._get_pool(config)
+        return self.catalog.get(self._cache_key(config), self.catalog.fingerprint(pool.params))
+
+    async def _discover(self, config: dict) -> List[Any]:
+        pool = self._get_pool(config)
+        timeout = pool.startup_timeout
+        print(f"→ Scanning tools from: {config['script']} in {pool.params.cwd}")
+        # Not wait_for: it waits for the cancelled start to unwind (stopping the
+        # process), which would stretch startup well past startup_timeout
+        starting = asyncio.create_task(self._start_and_list(pool))
+        try:
+            done, _ = await asyncio.wait({starting}, timeout=timeout)
+            if done:
+                tools = starting.result()
+                print(f"→ Tools received from {config['script']}: {[tool.name for tool in tools]}")
+                return tools
+            print(f"❌ Timed out after {timeout:.0f}s initializing MCP server {config['script']}")
+        except Exception as e:
+            print(f"❌ Error initializing MCP server {config['script']}: {e}")
+        # Stop the stuck server in the background; shutdown() waits for it
+        task = asyncio.create_task(self._abandon(starting, pool))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+        return []
+
+    @staticmethod
+    async def _abandon(starting: asyncio.Task, pool: "ServerPool"):
+        starting.cancel()
+        try:
+            await starting
+        except BaseException:
+            pass
+        await pool.close()
+
+    @staticmethod
+    async def _start_and_list(pool: "ServerPool") -> List[Any]:
+        await pool.start()
+        return await pool.list_tools()
 
     async def call_tool(self, tool_name: str, arguments: dict) -> Any:
         entry = self.tool_map.get(tool_name)
         if not entry:
             raise ValueError(f"Tool '{tool_name}' not found on any server.")
 
-        config = entry["config"]
-        params = StdioServerParameters(
-            command=sys.executable,
-            args=[config["script"]],
-            cwd=config.get("cwd", os.getcwd())
-        )
+        pool = self._get_pool(entry["config"])
+        try:
+            return await pool.call_tool(tool_name, arguments)
+        except ToolTimeoutError as e:
+            return self._timeout_result(e)
 
-        async with stdio_client(params) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                return await session.call_tool(tool_name, arguments)
+    @staticmethod
+    def _timeout_result(e: ToolTimeoutError) -> CallToolResult:
+        """Structured error result the agent loop can record and plan around."""
+        payload = {
+            "error": "timeout",
+            "tool": e.tool_name,
+            "timeout_seconds": e.timeout,
+            "message": str(e),
+        }
+        return CallToolResult(
+            content=[TextContent(type="text", text=json.dumps(payload))],
+            isError=True,
+        )
 
     async def list_all_tools(self) -> List[str]:
         return list(self.tool_map.keys())
@@ -109,5 +660,28 @@ class MultiMCP:
     def get_all_tools(self) -> List[Any]:
         return [entry["tool"] for entry in self.tool_map.values()]
 
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-server queue metrics, keyed by server id (or script name)."""
+        return {
+            pool.config.get("id") or pool.config["script"]: {
+                **pool.metrics.to_dict(),
+                "max_in_flight": pool.max_in_flight,
+                "in_flight": pool.in_flight,
+                "running": pool.running,
+            }
+            for pool in self.pools.values()
+        }
+
     async def shutdown(self):
-        pass  # no persistent sessions to close
\ No newline at end of file
+        if self._reaper is not None:
+            self._reaper.cancel()
+            try:
+                await self._reaper
+            except asyncio.CancelledError:
+                pass
+            self._reaper = None
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+        for pool in self.pools.values():
+            await pool.close()
+        self.pools = {}
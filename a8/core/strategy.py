@@ -26,9 +26,11 @@
 from modules.perception import PerceptionResult
 from modules.memory import MemoryItem
 from modules.tools import summarize_tools, filter_tools_by_hint
-from modules.decision import generate_plan
+from modules.decision import generate_plan, generate_fused_plan
+from modules.action import parse_function_calls
 from core.context import AgentContext
-from typing import Any
+from typing import Any, Optional, Tuple
+import asyncio
 
 
 async def decide_next_action(
@@ -37,43 +39,183 @@ async def decide_next_action(
     memory_items: list[MemoryItem],
     all_tools: list[Any],
     last_result: str = "",
+    tool_summary: Optional[str] = None,
 ) -> str:
     """
     Decides what to do next using the planning strategy defined in agent profile.
     Wraps around the `generate_plan()` logic with strategy-aware control.
+    `tool_summary` is the precomputed summary of `all_tools`, if the caller has one.
     """
+    full_summary = tool_summary or summarize_tools(all_tools)
 
     strategy = context.agent_profile.strategy
     step = context.step + 1
     max_steps = context.agent_profile.max_steps
+    max_calls = context.agent_profile.max_parallel_calls
     tool_hint = perception.tool_hint
 
+    if strategy == "explore_all":
+        return await explore_all(
+            perception=perception,
+            memory_items=memory_items,
+            all_tools=all_tools,
+            step_num=step,
+            max_steps=max_steps,
+            max_calls=max_calls,
+            width=context.agent_profile.explore_width,
+            full_summary=full_summary,
+        )
+
     # Step 1: Try hint-based filtered tools first
     filtered_tools = filter_tools_by_hint(all_tools, hint=tool_hint)
     filtered_summary = summarize_tools(filtered_tools)
 
-    plan = await generate_plan(
-        perception=perception,
-        memory_items=memory_items,
-        tool_descriptions=filtered_summary,
-        step_num=step,
-        max_steps=max_steps,
-    )
+    def plan_with(tool_descriptions: str):
+        return generate_plan(
+            perception=perception,
+            memory_items=memory_items,
+            tool_descriptions=tool_descriptions,
+            step_num=step,
+            max_steps=max_steps,
+            max_calls=max_calls,
+        )
+
+    # Only worth retrying when the hint actually narrowed the tool list
+    can_retry = strategy == "retry_once" and len(filtered_tools) < len(all_tools)
+
+    if can_retry and context.agent_profile.retry_concurrent:
+        # Race both plans; the full-tool plan only matters if the filtered one is unusable
+        filtered_task = asyncio.create_task(plan_with(filtered_summary))
+        full_task = asyncio.create_task(plan_with(full_summary))
+        try:
+            plan = await filtered_task
+            if "unknown" not in plan.lower():
+                return plan
+            return await full_task
+        finally:
+            # Also runs when this step is cancelled or the filtered plan fails mid-race
+            for task in (filtered_task, full_task):
+                task.cancel()
+
+    plan = await plan_with(filtered_summary)
 
     # Strategy enforcement
     if strategy == "conservative":
         return plan
 
-    if strategy == "retry_once" and "unknown" in plan.lower():
+    if can_retry and "unknown" in plan.lower():
         # Retry with all tools if hint-based filtering failed
-        full_summary = summarize_tools(all_tools)
-        return generate_plan(
+        return await plan_with(full_summary)
+
+    return plan
+
+
+async def decide_fused(
+    context: AgentContext,
+    query: str,
+    memory_items: list[MemoryItem],
+    all_tools: list[Any],
+    tool_summary: Optional[str] = None,
+) -> Tuple[PerceptionResult, str]:
+    """
+    Fused mode: perception and plan from a single LLM call. The tool hint is
+    not known before the call, so the prompt lists all tools; under retry_once
+    an "unknown" plan is retried once in layered form with the hint-filtered tools.
+    """
+    perception, plan = await generate_fused_plan(
+        user_input=query,
+        memory_items=memory_items,
+        tool_descriptions=tool_summary or summarize_tools(all_tools),
+        step_num=context.step + 1,
+        max_steps=context.agent_profile.max_steps,
+        max_calls=context.agent_profile.max_parallel_calls,
+    )
+
+    if context.agent_profile.strategy == "retry_once" and "unknown" in plan.lower():
+        filtered_tools = filter_tools_by_hint(all_tools, hint=perception.tool_hint)
+        if len(filtered_tools) < len(all_tools):
+            plan = await generate_plan(
+                perception=perception,
+                memory_items=memory_items,
+                tool_descriptions=summarize_tools(filtered_tools),
+                step_num=context.step + 1,
+                max_steps=context.agent_profile.max_steps,
+                max_calls=context.agent_profile.max_parallel_calls,
+            )
+
+    return perception, plan
+
+
+def score_plan(plan: str, all_tools: list[Any]) -> float:
+    """
+    Cheap, LLM-free score for a candidate plan. Higher is better.
+    A concrete answer ends the task, so it beats another well-formed call to
+    a real tool (which costs a step); "unknown" answers and unparseable or
+    invented tool calls lose.
+    """
+    plan = plan.strip()
+    if plan.startswith("FINAL_ANSWER:"):
+        answer = plan.split(":", 1)[1].strip().strip("[]").strip().lower()
+        if not answer or answer in ("unknown", "no result"):
+            return 0.0
+        return 3.0
+
+    try:
+        calls = parse_function_calls(plan)
+    except Exception:
+        return 0.0
+
+    known = {getattr(t, "name", None) for t in all_tools}
+    if not all(name in known for name, _ in calls):
+        return 0.5
+    return 2.0
+
+
+async def explore_all(
+    perception: PerceptionResult,
+    memory_items: list[MemoryItem],
+    all_tools: list[Any],
+    step_num: int,
+    max_steps: int,
+    max_calls: int = 1,
+    width: int = 3,
+    full_summary: Optional[str] = None,
+) -> str:
+    """
+    Generates up to `width` candidate plans concurrently from different views
+    of the context (hint-filtered vs. all tools, full vs. trimmed memory),
+    scores them with `score_plan` and returns the best one. Ties go to the
+    earlier, more focused variant. Views that would produce the same prompt
+    (no usable hint, little memory) are only sent once.
+    """
+    filtered_summary = summarize_tools(filter_tools_by_hint(all_tools, hint=perception.tool_hint))
+    full_summary = full_summary or summarize_tools(all_tools)
+    variants, seen = [], set()
+    for summary, variant_memory in [
+        (filtered_summary, memory_items),
+        (full_summary, memory_items),
+        (filtered_summary, memory_items[:1]),
+        (full_summary, []),
+    ]:
+        key = (summary, tuple(m.text for m in variant_memory))
+        if key not in seen:
+            seen.add(key)
+            variants.append((summary, variant_memory))
+    variants = variants[:max(1, width)]
+
+    plans = await asyncio.gather(*(
+        generate_plan(
             perception=perception,
-            memory_items=memory_items,
-            tool_descriptions=full_summary,
-            step_num=step,
+            memory_items=variant_memory,
+            tool_descriptions=summary,
+            step_num=step_num,
             max_steps=max_steps,
+            max_calls=max_calls,
         )
+        for summary, variant_memory in variants
+    ))
 
-    # Placeholder for future "explore_all" parallel planner
-    return plan
+    scores = [score_plan(plan, all_tools) for plan in plans]
+    best = max(range(len(plans)), key=lambda i: (scores[i], -i))
+    print(f"[strategy] explore_all scores: {scores} → picked candidate {best + 1}")
+    return plans[best]
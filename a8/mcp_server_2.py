@@ -12,6 +12,7 @@ import numpy as np
 from pathlib import Path
 import requests
 from markitdown import MarkItDown
+from modules.http_pool import get_sync_session, sync_timeout
 import time
 from models import AddInput, AddOutput, SqrtInput, SqrtOutput, StringsToIntsInput, StringsToIntsOutput, ExpSumInput, ExpSumOutput, PythonCodeInput, PythonCodeOutput, UrlInput, FilePathInput, MarkdownInput, MarkdownOutput, ChunkListOutput
 from tqdm import tqdm
@@ -40,10 +41,12 @@ CHUNK_OVERLAP = 40
 MAX_CHUNK_LENGTH = 512  # characters
 TOP_K = 3  # FAISS top-K matches
 ROOT = Path(__file__).parent.resolve()
+ollama = get_sync_session()  # shared keep-alive pool for Ollama chat/generate (never re-sent)
+ollama_embed = get_sync_session(retry_post=True)  # embeddings are safe to repeat on 429/5xx
 
 
 def get_embedding(text: str) -> np.ndarray:
-    response = requests.post(EMBED_URL, json={"model": EMBED_MODEL, "prompt": text})
+    response = ollama_embed.post(EMBED_URL, json={"model": EMBED_MODEL, "prompt": text}, timeout=sync_timeout())
     response.raise_for_status()
     return np.array(response.json()["embedding"], dtype=np.float32)
 
@@ -85,7 +88,7 @@ Just respond in one word (Yes or No), and do not provide any further explanation
     print(f"  Chunk {index} → {chunk1[:60]}{'...' if len(chunk1) > 60 else ''}")
     print(f"  Chunk {index+1} → {chunk2[:60]}{'...' if len(chunk2) > 60 else ''}")
 
-    response = requests.post(OLLAMA_CHAT_URL, json={
+    response = ollama.post(OLLAMA_CHAT_URL, json={
         "model": GEMMA_MODEL,
         "messages": [{"role": "user", "content": prompt}],
         "stream": False
@@ -135,7 +138,7 @@ def caption_image(img_url_or_path: str) -> str:
                 encoded_image = base64.b64encode(img_file.read()).decode("utf-8")
 
         # Set stream=True to get the full generator-style output
-        with requests.post(OLLAMA_URL, json={
+        with ollama.post(OLLAMA_URL, json={
             "model": GEMMA_MODEL,
             "prompt": "If there is lot of text in the image, then ONLY reply back with exact text in the image, else Describe the image such that your response can replace 'alt-text' for it. Only explain the contents of the image and provide no further explaination.",
             "images": [encoded_image],
@@ -262,7 +265,7 @@ Keep markdown formatting intact.
 """
 
         try:
-            response = requests.post(OLLAMA_CHAT_URL, json={
+            response = ollama.post(OLLAMA_CHAT_URL, json={
                 "model": GEMMA_MODEL,
                 "messages": [{"role": "user", "content": prompt}],
                 "stream": False
@@ -28,7 +28,7 @@ class ToolCallResult(BaseModel):
 
 import json
 import ast
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, List
 
 def log(tag: str, message: str) -> None:
     """Helper function for logging."""
@@ -92,6 +92,23 @@ def parse_function_call(response: str) -> Tuple[str, Dict[str, Any]]:
         raise
 
 
+def parse_function_calls(response: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Parses a plan that may contain several independent FUNCTION_CALL lines.
+
+    Example:
+    "FUNCTION_CALL: search|{"query": "X"}\nFUNCTION_CALL: search|{"query": "Y"}"
+
+    Returns:
+        A list of (tool_name, arguments_dict) tuples, in plan order
+    """
+    lines = [line.strip() for line in response.splitlines() if line.strip().startswith("FUNCTION_CALL:")]
+    if not lines:
+        # Fall back to the single-call parser for its error reporting
+        return [parse_function_call(response.strip())]
+    return [parse_function_call(line) for line in lines]
+
+
 def parse_function_call1(response: str) -> tuple[str, Dict[str, Any]]:
     """
     Parses a FUNCTION_CALL string like:
@@ -0,0 +1,176 @@
+# modules/ann_index.py → Vector Index Factory
+# Role: Build and tune the FAISS index behind MemoryManager (flat, HNSW, IVF-Flat, IVF-PQ).
+
+# Responsibilities:
+
+# Pick the index kind from the `memory.index` section of profiles.yaml, staying on exact
+# flat search until enough vectors exist to make (and train) an approximate index worthwhile
+
+# Train IVF coarse quantizers / PQ codebooks on a sample and add all vectors in one call
+
+# Build per-kind search parameters (efSearch / nprobe) that also carry an ID selector
+
+# Recall@k and latency report of the approximate index against exact search
+
+# Dependencies:
+
+# faiss, numpy
+
+# Used by: memory.py
+
+# modules/ann_index.py
+
+import time
+import math
+from typing import Dict, Any, Optional
+
+import faiss
+import numpy as np
+
+DEFAULTS = {
+    "type": "flat",          # flat, hnsw, ivf_flat, ivf_pq
+    "min_vectors": 10000,    # below this, exact flat search is fast enough and IVF cannot train well
+    "hnsw_m": 32,
+    "ef_construction": 200,
+    "ef_search": 64,
+    "nlist": 0,              # IVF lists; 0 = about 4 * sqrt(N)
+    "nprobe": 16,
+    "pq_m": 16,              # IVF-PQ sub-quantizers; lowered to a divisor of the embedding size if needed
+    "pq_bits": 8,
+}
+KINDS = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+MIN_POINTS_PER_CENTROID = 39  # FAISS warns (and clusters poorly) below this
+
+
+def settings(config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    merged = {**DEFAULTS, **(config or {})}
+    if merged["type"] not in KINDS:
+        print(f"[memory] ⚠️ Unknown index type {merged['type']!r}, using flat")
+        merged["type"] = "flat"
+    return merged
+
+
+def index_kind(index: Optional[faiss.Index]) -> Optional[str]:
+    if index is None:
+        return None
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if faiss.try_extract_index_ivf(index) is not None:
+        return "ivf_flat"
+    return "flat"
+
+
+def _nlist(config: Dict[str, Any], n: int) -> int:
+    nlist = config["nlist"] or int(4 * math.sqrt(n))
+    return max(1, min(nlist, n // MIN_POINTS_PER_CENTROID))
+
+
+def desired_kind(config: Dict[str, Any], n: int) -> str:
+    """Configured kind once the collection is large enough to train it; flat before that."""
+    kind = config["type"]
+    if kind == "flat" or n < config["min_vectors"]:
+        return "flat"
+    if kind == "ivf_pq" and n < MIN_POINTS_PER_CENTROID * (1 << config["pq_bits"]):
+        return "flat"  # too few points to train the PQ codebooks
+    return kind
+
+
+def _pq_m(config: Dict[str, Any], dim: int) -> int:
+    m = max(1, min(config["pq_m"], dim))
+    while dim % m:
+        m -= 1
+    return m
+
+
+def build_index(kind: str, vectors: np.ndarray, config: Dict[str, Any]) -> faiss.Index:
+    """New index of `kind` holding `vectors` (row i → id i); IVF kinds are trained on a sample first."""
+    n, dim = vectors.shape
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, config["hnsw_m"])
+        index.hnsw.efConstruction = config["ef_construction"]
+    elif kind in ("ivf_flat", "ivf_pq"):
+        nlist = _nlist(config, n)
+        quantizer = faiss.IndexFlatL2(dim)
+        if kind == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_m(config, dim), config["pq_bits"])
+        train_size = min(n, 256 * nlist)
+        if kind == "ivf_pq":
+            train_size = max(train_size, min(n, 256 * (1 << config["pq_bits"])))
+        sample = vectors[np.random.default_rng(0).choice(n, train_size, replace=False)] if train_size < n else vectors
+        index.train(sample)
+        index.make_direct_map()  # keeps reconstruct() working for filtered exact scoring
+    else:
+        index = faiss.IndexFlatL2(dim)
+
+    tune(index, config)
+    if n:
+        index.add(vectors)
+    return index
+
+
+def tune(index: faiss.Index, config: Dict[str, Any]):
+    """Applies query-time knobs (they are not all restored from a checkpoint)."""
+    kind = index_kind(index)
+    if kind == "hnsw":
+        index.hnsw.efSearch = config["ef_search"]
+    elif kind in ("ivf_flat", "ivf_pq"):
+        faiss.extract_index_ivf(index).nprobe = config["nprobe"]
+
+
+def search_params(index: faiss.Index, config: Dict[str, Any], selector=None):
+    """Search parameters of the type each index expects (IVF rejects the generic kind)."""
+    kind = index_kind(index)
+    if kind == "hnsw":
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=config["ef_search"])
+    if kind in ("ivf_flat", "ivf_pq"):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=config["nprobe"])
+    return faiss.SearchParameters(sel=selector) if selector is not None else None
+
+
+def _latencies(index: faiss.Index, queries: np.ndarray, top_k: int, params=None):
+    timings, ids = [], []
+    for query in queries:
+        started = time.perf_counter()
+        _, I = index.search(query.reshape(1, -1), top_k, params=params)
+        timings.append((time.perf_counter() - started) * 1000)
+        ids.append(I[0])
+    return np.array(timings), ids
+
+
+def recall_report(
+    index: faiss.Index,
+    vectors: np.ndarray,
+    config: Dict[str, Any],
+    sample: int = 100,
+    top_k: int = 10,
+) -> Dict[str, Any]:
+    """
+    Recall@k of `index` against exact search over `vectors`, plus per-query
+    latency (ms) for both, using `sample` stored vectors as queries.
+    """
+    n = len(vectors)
+    if n == 0:
+        return {"type": index_kind(index), "ntotal": 0}
+    top_k = min(top_k, n)
+    rows = np.random.default_rng(1).choice(n, min(sample, n), replace=False)
+    queries = vectors[rows]
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    exact_ms, truth = _latencies(exact, queries, top_k)
+    ann_ms, found = _latencies(index, queries, top_k, search_params(index, config))
+    recall = np.mean([len(set(t) & set(f)) / top_k for t, f in zip(truth, found)])
+
+    return {
+        "type": index_kind(index),
+        "ntotal": int(index.ntotal),
+        f"recall@{top_k}": round(float(recall), 4),
+        "p50_ms": round(float(np.percentile(ann_ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ann_ms, 95)), 3),
+        "exact_p50_ms": round(float(np.percentile(exact_ms, 50)), 3),
+        "exact_p95_ms": round(float(np.percentile(exact_ms, 95)), 3),
+    }
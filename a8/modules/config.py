@@ -0,0 +1,104 @@
+# modules/config.py → Process-wide Config Registry
+# Role: Load config/models.json and config/profiles.yaml once per process.
+
+# Responsibilities:
+
+# Parse both files on first use and hand the same dicts to every caller
+
+# Hot-reload when either file changes on disk (mtime checked at most once per second)
+
+# Expose a version counter so dependants (e.g. the shared ModelRouter) know when to rebuild
+
+# Applied on reload: models, llm routes/cache/stream, rate limits. Need a restart: the `http`
+# pool settings (pools are built once) and mcp_servers (servers are started once)
+
+# Dependencies:
+
+# yaml, json
+
+# Used by: model_manager.py, context.py, http_pool.py, agent.py
+
+# modules/config.py
+
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+import yaml
+
+ROOT = Path(__file__).parent.parent
+MODELS_JSON = ROOT / "config" / "models.json"
+PROFILE_YAML = ROOT / "config" / "profiles.yaml"
+
+
+class ConfigRegistry:
+    def __init__(
+        self,
+        models_path: Path = MODELS_JSON,
+        profile_path: Path = PROFILE_YAML,
+        check_interval: float = 1.0,
+    ):
+        self.models_path = Path(models_path)
+        self.profile_path = Path(profile_path)
+        self.check_interval = check_interval
+        self.version = 0
+        self._models: Dict[str, Any] = {}
+        self._profile: Dict[str, Any] = {}
+        self._mtimes: tuple = ()
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def _current_mtimes(self) -> tuple:
+        return tuple(p.stat().st_mtime_ns if p.exists() else None for p in (self.models_path, self.profile_path))
+
+    def reload(self):
+        with self._lock:
+            mtimes = self._current_mtimes()
+            models = json.loads(self.models_path.read_text()) if self.models_path.exists() else {}
+            profile = yaml.safe_load(self.profile_path.read_text()) if self.profile_path.exists() else {}
+            self._models, self._profile = models, profile or {}
+            self._mtimes = mtimes
+            self._last_check = time.monotonic()
+            self.version += 1
+
+    def maybe_reload(self):
+        """Reloads if either file changed on disk; checks mtimes at most once per check_interval."""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        mtimes = self._current_mtimes()
+        if mtimes != self._mtimes:
+            try:
+                self.reload()
+                print(f"[config] Reloaded configuration (version {self.version})")
+            except Exception as e:
+                # Keep serving the last good config if the edited file is mid-write or invalid
+                self._mtimes = mtimes
+                print(f"[config] ⚠️ Reload failed, keeping previous config: {e}")
+
+    @property
+    def models(self) -> Dict[str, Any]:
+        self.maybe_reload()
+        return self._models
+
+    @property
+    def profile(self) -> Dict[str, Any]:
+        self.maybe_reload()
+        return self._profile
+
+
+_registry: Optional[ConfigRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_config() -> ConfigRegistry:
+    """Returns the process-wide registry, creating it on first use."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ConfigRegistry()
+        return _registry
@@ -1,7 +1,7 @@
-from typing import List, Optional
-from modules.perception import PerceptionResult
+from typing import List, Optional, Tuple
+from modules.perception import PerceptionResult, parse_perception
 from modules.memory import MemoryItem
-from modules.model_manager import ModelManager
+from modules.model_router import get_router
 from dotenv import load_dotenv
 from google import genai
 import os
@@ -16,7 +16,86 @@ except ImportError:
         now = datetime.datetime.now().strftime("%H:%M:%S")
         print(f"[{now}] [{stage}] {msg}")
 
-model = ModelManager()
+
+PLAN_RULES = """📏 IMPORTANT Rules:
+
+- 🚫 Do NOT invent tools. Use only the tools listed above. Tool description has useage pattern, only use that.
+- 📄 If the question may relate to public/factual knowledge (like companies, people, places), use the `search_documents` tool to look for the answer.
+- 🧮 If the question is mathematical, use the appropriate math tool.
+- 🔁 Analyze that whether you have already got a good factual result from a tool, do NOT search again — summarize and respond with FINAL_ANSWER.
+- ❌ NEVER repeat tool calls with the same parameters unless the result was empty. When searching rely on first reponse from tools, as that is the best response probably.
+- ❌ NEVER output explanation text — only structured FUNCTION_CALL or FINAL_ANSWER.
+- ✅ Use nested keys like `input.string` or `input.int_list`, and square brackets for lists.
+- 💡 If no tool fits or you're unsure, end with: FINAL_ANSWER: [unknown]
+- ⏳ You have 5 attempts. Final attempt must end with FINAL_ANSWER.
+"""
+
+
+async def read_plan_stream(prompt: str, max_calls: int = 1) -> str:
+    """
+    Streams the planner reply and stops reading (cancelling the request) as soon
+    as the plan is decided: a complete FINAL_ANSWER line, or `max_calls`
+    complete FUNCTION_CALL lines. Returns the text read so far.
+    """
+    lines: List[str] = []
+    buffer = ""
+    calls = 0
+    stream = get_router().generate_stream(prompt, role="decision")
+    try:
+        async for chunk in stream:
+            buffer += chunk
+            while "\n" in buffer:
+                line, buffer = buffer.split("\n", 1)
+                lines.append(line)
+                stripped = line.strip()
+                if stripped.startswith("FINAL_ANSWER:") and calls == 0:
+                    return "\n".join(lines)
+                if stripped.startswith("FUNCTION_CALL:"):
+                    calls += 1
+                    if calls >= max_calls:
+                        return "\n".join(lines)
+    finally:
+        await stream.aclose()
+
+    lines.append(buffer)
+    return "\n".join(lines)
+
+
+def plan_format(max_calls: int) -> Tuple[str, str]:
+    """Response-format instruction and (for max_calls > 1) a parallel-call example for planner prompts."""
+    if max_calls > 1:
+        parallel_example = (
+            '- Independent lookups in one step:\n'
+            '  FUNCTION_CALL: search_documents|{"query":"Gensol"}\n'
+            '  FUNCTION_CALL: search_documents|{"query":"Go-Auto"}\n'
+        )
+        response_format = f"""Respond with **either one FINAL_ANSWER line, or 1 to {max_calls} FUNCTION_CALL lines** (one call per line).
+Only emit several FUNCTION_CALL lines when the calls are independent — none needs another's result — they will run in parallel."""
+        return response_format, parallel_example
+    return "Respond in **exactly one line** using one of the following formats:", ""
+
+
+async def request_plan(prompt: str, max_calls: int = 1) -> str:
+    """Sends a planner prompt, streaming with early stop when the router has streaming on."""
+    router = get_router()
+    if router.streaming:
+        return (await read_plan_stream(prompt, max_calls)).strip()
+    return (await router.generate_text(prompt, role="decision")).strip()
+
+
+def extract_plan(raw: str, max_calls: int = 1) -> str:
+    """Keeps the first FINAL_ANSWER line, or up to `max_calls` FUNCTION_CALL lines, from an LLM reply."""
+    calls = []
+    for line in raw.splitlines():
+        line = line.strip()
+        if line.startswith("FINAL_ANSWER:") and not calls:
+            return line
+        if line.startswith("FUNCTION_CALL:"):
+            calls.append(line)
+            if len(calls) >= max_calls:
+                break
+
+    return "\n".join(calls) if calls else "FINAL_ANSWER: [unknown]"
 
 
 async def generate_plan(
@@ -24,18 +103,23 @@ async def generate_plan(
     memory_items: List[MemoryItem],
     tool_descriptions: Optional[str] = None,
     step_num: int = 1,
-    max_steps: int = 3
+    max_steps: int = 3,
+    max_calls: int = 1
 ) -> str:
-    """Generates the next step plan for the agent: either tool usage or final answer."""
+    """
+    Generates the next step plan for the agent: either tool usage or final answer.
+    With max_calls > 1 the plan may hold several independent FUNCTION_CALL lines.
+    """
 
     memory_texts = "\n".join(f"- {m.text}" for m in memory_items) or "None"
     tool_context = f"\nYou have access to the following tools:\n{tool_descriptions}" if tool_descriptions else ""
+    response_format, parallel_example = plan_format(max_calls)
 
     prompt = f"""
 You are a reasoning-driven AI agent with access to tools and memory.
 Your job is to solve the user's request step-by-step by reasoning through the problem, selecting a tool if needed, and continuing until the FINAL_ANSWER is produced.
 
-Respond in **exactly one line** using one of the following formats:
+{response_format}
 
 - FUNCTION_CALL: tool_name| {{"param1":"value1","param2":"value2"}}
 - FINAL_ANSWER: [your final result] *(Not description, but actual final answer)
@@ -57,7 +141,7 @@ Respond in **exactly one line** using one of the following formats:
 - FUNCTION_CALL: strings_to_chars_to_int|{{'"input_string":"INDIA"}}
 - FUNCTION_CALL: int_list_to_exponential_sum|{{"input_int_list":[73,78,68,73,65]"}}
 - FINAL_ANSWER: [42] → Always mention final answer to the query, not that some other description.
-
+{parallel_example}
 ✅ Examples:
 - User asks: "What’s the relationship between Cricket and Sachin Tendulkar"
   - FUNCTION_CALL: search_documents| {{"query":"relationship between Cricket and Sachin Tendulkar"}}
@@ -66,32 +150,83 @@ Respond in **exactly one line** using one of the following formats:
 
 ---
 
-📏 IMPORTANT Rules:
-
-- 🚫 Do NOT invent tools. Use only the tools listed above. Tool description has useage pattern, only use that.
-- 📄 If the question may relate to public/factual knowledge (like companies, people, places), use the `search_documents` tool to look for the answer.
-- 🧮 If the question is mathematical, use the appropriate math tool.
-- 🔁 Analyze that whether you have already got a good factual result from a tool, do NOT search again — summarize and respond with FINAL_ANSWER.
-- ❌ NEVER repeat tool calls with the same parameters unless the result was empty. When searching rely on first reponse from tools, as that is the best response probably.
-- ❌ NEVER output explanation text — only structured FUNCTION_CALL or FINAL_ANSWER.
-- ✅ Use nested keys like `input.string` or `input.int_list`, and square brackets for lists.
-- 💡 If no tool fits or you're unsure, end with: FINAL_ANSWER: [unknown]
-- ⏳ You have 5 attempts. Final attempt must end with FINAL_ANSWER.
-"""
+{PLAN_RULES}"""
 
 
 
     try:
-        raw = (await model.generate_text(prompt)).strip()
+        raw = await request_plan(prompt, max_calls)
         log("plan", f"LLM output: {raw}")
-
-        for line in raw.splitlines():
-            if line.strip().startswith("FUNCTION_CALL:") or line.strip().startswith("FINAL_ANSWER:"):
-                return line.strip()
-
-        return "FINAL_ANSWER: [unknown]"
+        return extract_plan(raw, max_calls)
 
     except Exception as e:
         log("plan", f"⚠️ Planning failed: {e}")
         return "FINAL_ANSWER: [unknown]"
 
+
+
+async def generate_fused_plan(
+    user_input: str,
+    memory_items: List[MemoryItem],
+    tool_descriptions: Optional[str] = None,
+    step_num: int = 1,
+    max_steps: int = 3,
+    max_calls: int = 1
+) -> Tuple[PerceptionResult, str]:
+    """
+    Fused perception + planning: one LLM call returns a PERCEPTION line
+    (intent, entities, tool_hint) followed by the FUNCTION_CALL / FINAL_ANSWER plan.
+    Returns (perception, plan); perception falls back to the bare input if its line is missing.
+    """
+
+    memory_texts = "\n".join(f"- {m.text}" for m in memory_items) or "None"
+    tool_context = f"\nYou have access to the following tools:\n{tool_descriptions}" if tool_descriptions else ""
+    response_format, parallel_example = plan_format(max_calls)
+
+    prompt = f"""
+You are a reasoning-driven AI agent with access to tools and memory.
+Your job is to understand the user's request and decide the next step, continuing until the FINAL_ANSWER is produced.
+
+First output exactly one PERCEPTION line with a single-line JSON object:
+PERCEPTION: {{"intent": "<brief phrase about what the user wants>", "entities": ["<keywords or values>"], "tool_hint": "<most useful tool name or null>"}}
+
+Then, on the following line(s): {response_format}
+
+- FUNCTION_CALL: tool_name| {{"param1":"value1","param2":"value2"}}
+- FINAL_ANSWER: [your final result] *(Not description, but actual final answer)
+
+🧠 Context:
+- Step: {step_num} of {max_steps}
+- Memory: 
+{memory_texts}
+{tool_context}
+
+🎯 Input: "{user_input}"
+
+✅ Examples:
+PERCEPTION: {{"intent": "sum of exponentials of ASCII values", "entities": ["INDIA"], "tool_hint": "strings_to_chars_to_int"}}
+FUNCTION_CALL: strings_to_chars_to_int|{{"input_string":"INDIA"}}
+
+PERCEPTION: {{"intent": "report the computed result", "entities": ["42"], "tool_hint": null}}
+FINAL_ANSWER: [42]
+{parallel_example}
+---
+
+{PLAN_RULES}"""
+
+    try:
+        raw = await request_plan(prompt, max_calls)
+        log("plan", f"LLM output: {raw}")
+        perception_line = next(
+            (line.strip() for line in raw.splitlines() if line.strip().startswith("PERCEPTION:")), ""
+        )
+        try:
+            perception = parse_perception(perception_line[len("PERCEPTION:"):], user_input)
+        except Exception as e:
+            log("perception", f"⚠️ Fused perception missing or invalid: {e}")
+            perception = PerceptionResult(user_input=user_input, intent=None)
+        return perception, extract_plan(raw, max_calls)
+
+    except Exception as e:
+        log("plan", f"⚠️ Fused planning failed: {e}")
+        return PerceptionResult(user_input=user_input, intent=None), "FINAL_ANSWER: [unknown]"
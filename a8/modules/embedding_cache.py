@@ -0,0 +1,157 @@
+# modules/embedding_cache.py → Embedding Cache
+# Role: Content-addressed cache for embedding vectors, shared by every MemoryManager in the process.
+
+# Responsibilities:
+
+# Key vectors on (embedding model name, text hash)
+
+# Bounded in-memory LRU tier in front of an optional on-disk SQLite tier (float32 blobs)
+
+# Hit/miss counters; no TTL — an embedding only changes when the model does, and the model is in the key
+
+# Dependencies:
+
+# numpy, sqlite3 (stdlib), modules/config.py (optional `memory.embedding_cache` section of profiles.yaml)
+
+# Used by: memory.py
+
+# modules/embedding_cache.py
+
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+import numpy as np
+
+from modules.config import get_config, ROOT
+
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        db_path: Optional[Path] = None,
+        max_disk_entries: int = 100000,
+    ):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+        self.stats: Dict[str, int] = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            db_path = Path(db_path)
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_access ON embeddings(last_access)")
+            self._db.commit()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]], root: Path) -> Optional["EmbeddingCache"]:
+        """Builds a cache from the `memory.embedding_cache` profile section; None when disabled."""
+        if not config or not config.get("enabled", False):
+            return None
+        disk_path = config.get("disk_path")
+        return cls(
+            max_entries=config.get("memory_entries", 4096),
+            db_path=(root / disk_path) if disk_path else None,
+            max_disk_entries=config.get("disk_entries", 100000),
+        )
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, model_name: str, text: str) -> Optional[np.ndarray]:
+        key = self.make_key(model_name, text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.stats["hits"] += 1
+                return vector
+
+            if self._db is not None:
+                row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+                if row:
+                    self._db.execute("UPDATE embeddings SET last_access = ? WHERE key = ?", (time.time(), key))
+                    self._db.commit()
+                    vector = self._remember(key, np.frombuffer(row[0], dtype=np.float32))
+                    self.stats["hits"] += 1
+                    self.stats["disk_hits"] += 1
+                    return vector
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, model_name: str, text: str, vector: np.ndarray) -> np.ndarray:
+        """Stores the vector and returns the cached (read-only float32) copy."""
+        key = self.make_key(model_name, text)
+        vector = np.array(vector, dtype=np.float32)
+        with self._lock:
+            vector = self._remember(key, vector)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                    (key, vector.tobytes(), time.time()),
+                )
+                # Counting rows on every put would dominate bulk loads; trim in batches instead
+                self._puts_since_evict += 1
+                if self._puts_since_evict >= 100:
+                    self._evict_disk()
+                self._db.commit()
+        return vector
+
+    def _remember(self, key: str, vector: np.ndarray) -> np.ndarray:
+        vector.setflags(write=False)  # shared between callers; FAISS copies on add/search
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+        return vector
+
+    def _evict_disk(self):
+        self._puts_since_evict = 0
+        (count,) = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        overflow = count - self.max_disk_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+            self.stats["evictions"] += overflow
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+
+
+_shared: Optional[EmbeddingCache] = None
+_shared_loaded = False
+_shared_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide cache shared across sessions; None when `memory.embedding_cache` is disabled."""
+    global _shared, _shared_loaded
+    with _shared_lock:
+        if not _shared_loaded:
+            config = (get_config().profile.get("memory") or {}).get("embedding_cache")
+            _shared = EmbeddingCache.from_config(config, ROOT)
+            _shared_loaded = True
+        return _shared
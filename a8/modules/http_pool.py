@@ -0,0 +1,137 @@
+# modules/http_pool.py → Shared HTTP Connection Pools
+# Role: Keep-alive connection pools for every Ollama-facing HTTP call.
+
+# Responsibilities:
+
+# Process-wide requests.Sessions (sync) and one httpx.AsyncClient per event loop (async)
+
+# Status retries only repeat requests that are safe to repeat: chat/generate POSTs (sync or
+# async) are never re-sent, embedding POSTs opt in with get_sync_session(retry_post=True);
+# 429s from generate calls are left to the rate limiter's backoff in ModelManager
+
+# Configurable pool size, retries and exponential backoff
+
+# Dependencies:
+
+# requests, urllib3, httpx, modules/config.py (optional `http` section of profiles.yaml)
+
+# Used by: model_manager.py, memory.py, mcp_server_2.py
+
+# modules/http_pool.py
+
+import asyncio
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from modules.config import get_config
+
+DEFAULTS = {
+    "pool_size": 16,        # keep-alive connections per host
+    "retries": 3,           # retries on connection errors and 429/5xx replies
+    "backoff": 0.5,         # seconds; doubles on every retry
+    "timeout": 300.0,       # read timeout — LLM replies can take a while
+    "connect_timeout": 10.0,
+}
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_lock = threading.Lock()
+_settings: Optional[Dict[str, Any]] = None
+_sync_sessions: Dict[bool, requests.Session] = {}  # retry_post → session
+_async_clients: Dict[int, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}  # id(loop) → (loop, client)
+
+
+def settings() -> Dict[str, Any]:
+    """
+    Pool settings: DEFAULTS overridden by the `http` section of profiles.yaml.
+    Read once; the pools are built from them, so changes need a restart (no hot-reload).
+    """
+    global _settings
+    if _settings is None:
+        merged = dict(DEFAULTS)
+        try:
+            merged.update(get_config().profile.get("http") or {})
+        except Exception:
+            pass
+        _settings = merged
+    return _settings
+
+
+def configure(**overrides):
+    """Overrides pool settings; only affects pools created afterwards."""
+    settings().update(overrides)
+
+
+def timeout() -> httpx.Timeout:
+    s = settings()
+    return httpx.Timeout(s["timeout"], connect=s["connect_timeout"])
+
+
+def sync_timeout() -> Tuple[float, float]:
+    """(connect, read) timeout tuple for requests calls on the shared session."""
+    s = settings()
+    return (s["connect_timeout"], s["timeout"])
+
+
+def get_sync_session(retry_post: bool = False) -> requests.Session:
+    """
+    Shared keep-alive session. Connection failures are always retried; read errors and 429/5xx
+    replies are retried for idempotent methods, plus POST when `retry_post` (e.g. embeddings).
+    """
+    with _lock:
+        session = _sync_sessions.get(retry_post)
+        if session is None:
+            s = settings()
+            allowed_methods = Retry.DEFAULT_ALLOWED_METHODS
+            if retry_post:
+                allowed_methods = allowed_methods | {"POST"}
+            retry = Retry(
+                total=s["retries"],
+                backoff_factor=s["backoff"],
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=allowed_methods,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=s["pool_size"], max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sync_sessions[retry_post] = session
+        return session
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """httpx clients are bound to the loop they were created on, so keep one per loop."""
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(id(loop))
+    if entry is None or entry[0] is not loop or entry[1].is_closed:
+        s = settings()
+        transport = httpx.AsyncHTTPTransport(
+            retries=s["retries"],  # connection failures only: the request never reached the server
+            limits=httpx.Limits(max_connections=s["pool_size"], max_keepalive_connections=s["pool_size"]),
+        )
+        entry = (loop, httpx.AsyncClient(timeout=timeout(), transport=transport))
+        _async_clients[id(loop)] = entry
+    return entry[1]
+
+
+async def post_json(url: str, payload: Dict[str, Any]) -> Any:
+    """
+    POSTs JSON on the shared async client. Error replies are raised, not re-sent: the
+    caller (ModelManager) backs off on 429 under its rate limiter, and a generate POST
+    that reached the server is not repeated behind its back.
+    """
+    response = await get_async_client().post(url, json=payload)
+    response.raise_for_status()
+    return response.json()
+
+
+async def aclose():
+    """Closes the async client bound to the current loop."""
+    entry = _async_clients.pop(id(asyncio.get_running_loop()), None)
+    if entry is not None:
+        await entry[1].aclose()
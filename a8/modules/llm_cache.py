@@ -0,0 +1,150 @@
+# modules/llm_cache.py → LLM Response Cache
+# Role: Content-addressed cache for LLM text responses.
+
+# Responsibilities:
+
+# Key responses on (model key, prompt hash, generation params)
+
+# In-memory LRU tier in front of an optional on-disk SQLite tier
+
+# Size- and TTL-based eviction, hit/miss counters
+
+# Dependencies:
+
+# sqlite3 (stdlib)
+
+# Used by: model_manager.py
+
+# modules/llm_cache.py
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+
+class LLMResponseCache:
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: Optional[float] = 86400,
+        db_path: Optional[Path] = None,
+        max_disk_entries: int = 10000,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # key → (response, created_at)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            db_path = Path(db_path)
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache(last_access)")
+            self._db.commit()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]], root: Path) -> Optional["LLMResponseCache"]:
+        """Builds a cache from the `llm.cache` profile section; None when disabled."""
+        if not config or not config.get("enabled", False):
+            return None
+        disk_path = config.get("disk_path")
+        return cls(
+            max_entries=config.get("memory_entries", 256),
+            ttl_seconds=config.get("ttl_seconds", 86400),
+            db_path=(root / disk_path) if disk_path else None,
+            max_disk_entries=config.get("disk_entries", 10000),
+        )
+
+    @staticmethod
+    def make_key(model_key: str, prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        material = json.dumps({"model": model_key, "prompt": prompt_hash, "params": params or {}}, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[1], now):
+                    self._memory.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[0]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and not self._expired(row[1], now):
+                    self._db.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.stats["hits"] += 1
+                    self.stats["disk_hits"] += 1
+                    return row[0]
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str, response: str):
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, response, created_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, response, now, now),
+                )
+                self._evict_disk(now)
+                self._db.commit()
+
+    def _remember(self, key: str, response: str, created_at: float):
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _evict_disk(self, now: float):
+        if self.ttl_seconds:
+            self._db.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        (count,) = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        overflow = count - self.max_disk_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+            self.stats["evictions"] += overflow
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def close(self):
+        """Closes the SQLite tier; later lookups only use (and fill) the memory tier."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -7,11 +7,18 @@
 
 # Use local embedding server (e.g., Ollama) to vectorize input
 
-# Filter memory based on type/tags/session
+# Filter memory based on type/tags/session — inverted indexes pick the candidate rows up front,
+# so filtered retrieval returns top_k matches without scanning unrelated memories
 
 # Dependencies:
 
-# faiss, requests, pydantic
+# faiss, pydantic, modules/http_pool.py (pooled HTTP to the embedding server)
+
+# modules/embedding_cache.py (repeated texts and queries skip the embedding server)
+
+# modules/memory_store.py (optional durable store shared by all sessions on the node)
+
+# modules/ann_index.py (flat / HNSW / IVF index selection, training and recall report)
 
 # Used by: context.py, loop.py
 
@@ -21,12 +28,19 @@
 
 # modules/memory.py
 
-from typing import List, Optional, Literal
+from typing import List, Optional, Literal, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
 from pydantic import BaseModel
 from datetime import datetime
-import requests
 import numpy as np
 import faiss
+from modules import http_pool
+from modules.embedding_cache import EmbeddingCache, get_embedding_cache
+from modules.memory_store import MemoryStore
+from modules import ann_index
+from modules.config import ROOT
 
 
 class MemoryItem(BaseModel):
@@ -40,30 +54,228 @@ class MemoryItem(BaseModel):
 
 
 class MemoryManager:
-    def __init__(self, embedding_model_url: str, model_name: str = "nomic-embed-text"):
+    def __init__(
+        self,
+        embedding_model_url: str,
+        model_name: str = "nomic-embed-text",
+        cache: Optional[EmbeddingCache] = None,
+        use_cache: bool = True,
+        batch_url: Optional[str] = None,
+        batch_size: int = 32,
+        max_concurrency: int = 4,
+        store: Optional[MemoryStore] = None,
+        exact_filter_limit: int = 4096,
+        index_config: Optional[Dict[str, Any]] = None,
+    ):
         self.embedding_model_url = embedding_model_url
         self.model_name = model_name
-        self.index: Optional[faiss.IndexFlatL2] = None
+        # Batched endpoint (Ollama /api/embed: {"input": [...]} → {"embeddings": [...]}).
+        # It returns normalised vectors, unlike /api/embeddings, so when set it serves every
+        # embedding and gets its own cache namespace — one index never mixes the two.
+        self.batch_url = batch_url
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)  # parallel single requests when no batch_url
+        self.cache_model = f"{model_name}#embed" if batch_url else model_name
+        # Defaults to the process-wide cache, so every session shares embeddings of repeated texts
+        self.cache = cache if cache is not None else (get_embedding_cache() if use_cache else None)
+        # Flat until the collection is big enough for the configured approximate index (memory.index)
+        self.index_config = ann_index.settings(index_config)
+        self._rebuild_blocked = False
+        self._rebuild_thread: Optional[threading.Thread] = None
+        self.index: Optional[faiss.Index] = None
         self.data: List[MemoryItem] = []
-        self.embeddings: List[np.ndarray] = []
+        # Inverted indexes: field value → FAISS row ids (row id == position in self.data)
+        self._by_session: Dict[str, List[int]] = {}
+        self._by_type: Dict[str, List[int]] = {}
+        self._by_tag: Dict[str, List[int]] = {}
+        self.exact_filter_limit = exact_filter_limit
+        self.store = store
+        self._lock = threading.RLock()  # sessions share a stored manager; retrieve runs in worker threads
+        if store is not None:
+            self._load()
 
-    def _get_embedding(self, text: str) -> np.ndarray:
-        response = requests.post(
+    def _load(self):
+        """Loads the last index checkpoint and replays rows written after it — nothing is re-embedded."""
+        index = self.store.load_index()
+        stored = self.store.count()
+        if index is not None and index.ntotal > stored:
+            print("[memory] ⚠️ Index checkpoint is ahead of the store, rebuilding from the store")
+            index = None
+        if index is not None:
+            ann_index.tune(index, self.index_config)
+            self.index = index
+            self._register([MemoryItem(**item) for item in self.store.items(0, index.ntotal)])
+        self._sync()
+        print(f"[memory] Loaded {len(self.data)} stored memories from {self.store.path}")
+
+    def _sync(self):
+        """Appends rows other processes have stored since we last looked."""
+        if self.store is None or self.store.count() <= len(self.data):
+            return
+        items, vectors = self.store.rows(len(self.data))
+        if items:
+            self._index_vectors([MemoryItem(**item) for item in items], vectors)
+
+    def _request_embedding(self, text: str) -> np.ndarray:
+        response = http_pool.get_sync_session(retry_post=True).post(
             self.embedding_model_url,
-            json={"model": self.model_name, "prompt": text}
+            json={"model": self.model_name, "prompt": text},
+            timeout=http_pool.sync_timeout()
         )
         response.raise_for_status()
         return np.array(response.json()["embedding"], dtype=np.float32)
 
-    def add(self, item: MemoryItem):
-        embedding = self._get_embedding(item.text)
-        self.embeddings.append(embedding)
-        self.data.append(item)
+    def _request_embeddings(self, texts: List[str]) -> np.ndarray:
+        """One (n, dim) float32 array for `texts`: a single batched call, or capped concurrent calls."""
+        if self.batch_url:
+            response = http_pool.get_sync_session(retry_post=True).post(
+                self.batch_url,
+                json={"model": self.model_name, "input": texts},
+                timeout=http_pool.sync_timeout()
+            )
+            response.raise_for_status()
+            return np.asarray(response.json()["embeddings"], dtype=np.float32)
+
+        if len(texts) == 1:
+            return self._request_embedding(texts[0]).reshape(1, -1)
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(texts))) as pool:
+            return np.stack(list(pool.map(self._request_embedding, texts)))
+
+    def _get_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Embeds `texts` in order; cache hits are skipped and misses go out in `batch_size` chunks."""
+        vectors: List[Optional[np.ndarray]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}  # text → positions, so duplicates are embedded once
+        for i, text in enumerate(texts):
+            cached = self.cache.get(self.cache_model, text) if self.cache is not None else None
+            if cached is not None:
+                vectors[i] = cached
+            else:
+                missing.setdefault(text, []).append(i)
+
+        pending = list(missing)
+        for start in range(0, len(pending), self.batch_size):
+            chunk = pending[start:start + self.batch_size]
+            for text, vector in zip(chunk, self._request_embeddings(chunk)):
+                if self.cache is not None:
+                    vector = self.cache.put(self.cache_model, text, vector)
+                for i in missing[text]:
+                    vectors[i] = vector
+
+        return np.ascontiguousarray(np.stack(vectors), dtype=np.float32)
+
+    def _get_embedding(self, text: str) -> np.ndarray:
+        return self._get_embeddings([text])[0]
+
+    def _register(self, items: List[MemoryItem]):
+        """Appends items to self.data and the inverted indexes."""
+        start = len(self.data)
+        self.data.extend(items)
+        for row, item in enumerate(items, start):
+            if item.session_id:
+                self._by_session.setdefault(item.session_id, []).append(row)
+            self._by_type.setdefault(item.type, []).append(row)
+            for tag in set(item.tags):
+                self._by_tag.setdefault(tag, []).append(row)
+
+    def _index_vectors(self, items: List[MemoryItem], vectors: np.ndarray):
+        self._register(items)
 
         # Init or add to index
         if self.index is None:
-            self.index = faiss.IndexFlatL2(len(embedding))
-        self.index.add(np.stack([embedding]))
+            self.index = faiss.IndexFlatL2(vectors.shape[1])
+        self.index.add(vectors)
+        self._maybe_rebuild_index()
+
+    def _all_vectors(self) -> Optional[np.ndarray]:
+        """Every stored vector in row order."""
+        return self._vectors_since(0)
+
+    def _maybe_rebuild_index(self):
+        """
+        Switches index kind when the collection crosses `min_vectors` (or the config changed).
+        The build (and IVF/PQ training) runs in a background thread; searches and adds keep
+        using the current index until the new one is swapped in.
+        """
+        target = ann_index.desired_kind(self.index_config, self.index.ntotal)
+        if self._rebuild_blocked or self.rebuilding or ann_index.index_kind(self.index) == target:
+            return
+        vectors = self._all_vectors()
+        if vectors is None:
+            print(f"[memory] ⚠️ Cannot rebuild as {target}: original vectors are not available")
+            self._rebuild_blocked = True
+            return
+
+        self._rebuild_thread = threading.Thread(
+            target=self._rebuild_index, args=(target, vectors), name="memory-index-rebuild", daemon=True
+        )
+        self._rebuild_thread.start()
+
+    @property
+    def rebuilding(self) -> bool:
+        return self._rebuild_thread is not None and self._rebuild_thread.is_alive()
+
+    def wait_for_rebuild(self, timeout: Optional[float] = None):
+        if self._rebuild_thread is not None:
+            self._rebuild_thread.join(timeout)
+
+    def _rebuild_index(self, target: str, vectors: np.ndarray):
+        try:
+            started = time.perf_counter()
+            index = ann_index.build_index(target, vectors, self.index_config)
+            elapsed = time.perf_counter() - started
+            report = ann_index.recall_report(index, vectors, self.index_config, sample=50) if target != "flat" else None
+
+            with self._lock:
+                # Rows added while we were building go in before the swap
+                if len(self.data) > len(vectors):
+                    index.add(self._vectors_since(len(vectors)))
+                self.index = index
+                if self.store is not None:
+                    self.store.save_index(self.index)
+
+            print(f"[memory] Built {target} index over {index.ntotal} vectors in {elapsed:.2f}s")
+            if report:
+                print(f"[memory] Index report: {report}")
+        except Exception as e:
+            print(f"[memory] ⚠️ Index rebuild as {target} failed, staying on {ann_index.index_kind(self.index)}: {e}")
+            self._rebuild_blocked = True
+
+    def _vectors_since(self, start: int) -> Optional[np.ndarray]:
+        """
+        Stored vectors for rows [start, ntotal), read back from the index (flat, HNSW and IVF
+        with a direct map keep them exactly). IVF-PQ only keeps compressed codes, so its rows
+        come from the store when there is one.
+        """
+        count = self.index.ntotal - start
+        if ann_index.index_kind(self.index) == "ivf_pq" and self.store is not None:
+            _, vectors = self.store.rows(start)
+            return vectors[:count] if vectors is not None else None
+        try:
+            return self.index.reconstruct_n(start, count)
+        except RuntimeError:
+            return None
+
+    def index_report(self, sample: int = 100, top_k: int = 10) -> Dict[str, Any]:
+        """Recall@k and per-query latency of the current index against exact search."""
+        with self._lock:
+            vectors = self._all_vectors() if self.index is not None else None
+            if vectors is None:
+                return {"type": ann_index.index_kind(self.index), "ntotal": len(self.data)}
+            return ann_index.recall_report(self.index, vectors, self.index_config, sample, top_k)
+
+    def _add_vectors(self, items: List[MemoryItem], vectors: np.ndarray):
+        with self._lock:
+            if self.store is not None:
+                # Rows are written before the index is touched, so a crash never leaves an unsaved vector
+                with self.store.transaction():
+                    self._sync()
+                    self.store.insert(len(self.data), [item.model_dump() for item in items], vectors)
+            self._index_vectors(items, vectors)
+            if self.store is not None:
+                self.store.maybe_checkpoint(self.index, len(items))
+
+    def add(self, item: MemoryItem):
+        self._add_vectors([item], self._get_embeddings([item.text]))
 
     def retrieve(
         self,
@@ -73,31 +285,111 @@ class MemoryManager:
         tag_filter: Optional[List[str]] = None,
         session_filter: Optional[str] = None
     ) -> List[MemoryItem]:
-        if not self.index or len(self.data) == 0:
-            return []
-
+        if type_filter == "all":
+            type_filter = None
         query_vec = self._get_embedding(query).reshape(1, -1)
-        D, I = self.index.search(query_vec, top_k * 2)  # overfetch for filtering
+        with self._lock:
+            self._sync()
+            if not self.index or len(self.data) == 0:
+                return []
+            candidates = self._candidates(type_filter, tag_filter, session_filter)
+            if candidates is None:
+                rows = self._search(query_vec, top_k)
+            elif len(candidates) == 0:
+                return []
+            elif len(candidates) <= self.exact_filter_limit:
+                rows = self._search_rows(query_vec, candidates, top_k)
+            else:
+                rows = self._search(query_vec, top_k, faiss.IDSelectorBatch(candidates))
+            return [self.data[row] for row in rows]
+
+    def _candidates(
+        self,
+        type_filter: Optional[str],
+        tag_filter: Optional[List[str]],
+        session_filter: Optional[str],
+    ) -> Optional[np.ndarray]:
+        """Sorted row ids matching every filter (any of the tags); None when nothing is filtered."""
+        selected: Optional[set] = None
 
-        results = []
-        for idx in I[0]:
-            if idx >= len(self.data):
-                continue
-            item = self.data[idx]
+        def narrow(rows):
+            nonlocal selected
+            selected = set(rows) if selected is None else selected.intersection(rows)
 
-            if type_filter and item.type != type_filter:
-                continue
-            if tag_filter and not any(tag in item.tags for tag in tag_filter):
-                continue
-            if session_filter and item.session_id != session_filter:
-                continue
+        # Each filter only narrows the set, so unfiltered fields cost nothing
+        if session_filter:
+            narrow(self._by_session.get(session_filter, ()))
+        if type_filter:
+            narrow(self._by_type.get(type_filter, ()))
+        if tag_filter:
+            narrow(row for tag in tag_filter for row in self._by_tag.get(tag, ()))
+        if selected is None:
+            return None
+        return np.fromiter(sorted(selected), dtype=np.int64, count=len(selected))
 
-            results.append(item)
-            if len(results) >= top_k:
-                break
+    def _search(self, query_vec: np.ndarray, top_k: int, selector=None) -> List[int]:
+        """Index search, restricted to the selected ids when a FAISS IDSelector is given."""
+        params = ann_index.search_params(self.index, self.index_config, selector)
+        _, I = self.index.search(query_vec, top_k, params=params)
+        return [int(row) for row in I[0] if 0 <= row < len(self.data)]
 
-        return results
+    def _search_rows(self, query_vec: np.ndarray, rows: np.ndarray, top_k: int) -> List[int]:
+        """
+        Exact L2 over a small candidate set — cost grows with the matches, not with total memory.
+        (IVF-PQ hands back its compressed approximation of each vector, which is still close.)
+        """
+        try:
+            vectors = self.index.reconstruct_batch(rows)
+        except RuntimeError:
+            # Index type cannot hand back stored vectors; let FAISS filter during the search instead
+            return self._search(query_vec, top_k, faiss.IDSelectorBatch(rows))
+        distances = ((vectors - query_vec) ** 2).sum(axis=1)
+        best = np.argsort(distances)[:top_k]
+        return [int(rows[i]) for i in best]
 
     def bulk_add(self, items: List[MemoryItem]):
-        for item in items:
-            self.add(item)
+        """Embeds all items in batches and adds them to the index in a single call."""
+        if not items:
+            return
+        self._add_vectors(list(items), self._get_embeddings([item.text for item in items]))
+
+    def close(self):
+        """Writes a final index checkpoint for stored memory."""
+        self.wait_for_rebuild()
+        with self._lock:
+            if self.store is not None:
+                self.store.close(self.index)
+                self.store = None
+
+
+_shared: Dict[str, MemoryManager] = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_memory(memory_config: Dict[str, Any]) -> MemoryManager:
+    """
+    One MemoryManager per `store_path` for the whole process, so every session
+    reads and writes the same durable memory (sessions stay apart via session_id).
+    """
+    store_path = ROOT / memory_config["store_path"]
+    with _shared_lock:
+        key = str(store_path)
+        if key not in _shared:
+            _shared[key] = MemoryManager(
+                embedding_model_url=memory_config["embedding_url"],
+                model_name=memory_config["embedding_model"],
+                batch_url=memory_config.get("embedding_batch_url"),
+                batch_size=memory_config.get("embed_batch_size", 32),
+                max_concurrency=memory_config.get("embed_concurrency", 4),
+                exact_filter_limit=memory_config.get("exact_filter_limit", 4096),
+                index_config=memory_config.get("index"),
+                store=MemoryStore(store_path, checkpoint_every=memory_config.get("checkpoint_every", 50)),
+            )
+        return _shared[key]
+
+
+def close_shared_memory():
+    with _shared_lock:
+        for manager in _shared.values():
+            manager.close()
+        _shared.clear()
@@ -0,0 +1,133 @@
+# modules/memory_store.py → Persistent Memory Store
+# Role: Durable backing store for MemoryManager, shared by every session and process on a node.
+
+# Responsibilities:
+
+# SQLite table with one row per memory item: metadata JSON + float32 vector, row id == FAISS row
+
+# Save incrementally: each add is one short write transaction, never a rewrite of the whole store
+
+# Periodic FAISS index checkpoints (atomic replace), so startup neither re-embeds nor rebuilds;
+# rows written after the last checkpoint are replayed from SQLite
+
+# Dependencies:
+
+# faiss, numpy, sqlite3 (stdlib)
+
+# Used by: memory.py
+
+# modules/memory_store.py
+
+import os
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import List, Tuple, Optional, Any, Dict
+
+import faiss
+import numpy as np
+
+
+class MemoryStore:
+    DB_NAME = "memory.sqlite"
+    INDEX_NAME = "memory.faiss"
+
+    def __init__(self, path: Path, checkpoint_every: int = 50):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.path / self.DB_NAME
+        self.index_path = self.path / self.INDEX_NAME
+        self.checkpoint_every = max(1, checkpoint_every)
+        self._since_checkpoint = 0
+        self._lock = threading.RLock()  # transaction() holds it while the caller replays rows
+
+        # Autocommit mode: transactions are opened explicitly (BEGIN IMMEDIATE) around appends
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")  # readers in other processes never block the writer
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS memory ("
+            "id INTEGER PRIMARY KEY, session_id TEXT, type TEXT, item TEXT NOT NULL, vector BLOB NOT NULL)"
+        )
+
+    def count(self) -> int:
+        with self._lock:
+            (count,) = self._db.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM memory").fetchone()
+        return count
+
+    def items(self, start: int = 0, stop: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Item dicts for rows [start, stop), in id order."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT item FROM memory WHERE id >= ? AND id < ? ORDER BY id",
+                (start, stop if stop is not None else 2 ** 62),
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def rows(self, start: int) -> Tuple[List[Dict[str, Any]], Optional[np.ndarray]]:
+        """Item dicts and stacked vectors for every row with id >= start (e.g. written by another process)."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT item, vector FROM memory WHERE id >= ? ORDER BY id", (start,)
+            ).fetchall()
+        if not rows:
+            return [], None
+        vectors = np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+        return [json.loads(row[0]) for row in rows], vectors
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction; holds SQLite's write lock so row ids stay contiguous across processes."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def insert(self, start_id: int, items: List[Dict[str, Any]], vectors: np.ndarray):
+        """Call inside `transaction()`; the caller's lock is already held."""
+        self._db.executemany(
+            "INSERT INTO memory (id, session_id, type, item, vector) VALUES (?, ?, ?, ?, ?)",
+            [
+                (start_id + offset, item.get("session_id"), item.get("type"), json.dumps(item), vector.tobytes())
+                for offset, (item, vector) in enumerate(zip(items, vectors))
+            ],
+        )
+
+    def load_index(self) -> Optional[faiss.Index]:
+        """
+        Last checkpointed index, read into RAM. It is not memory-mapped (IO_FLAG_MMAP_IFC):
+        a mapped index is read-only, and MemoryManager keeps adding to the loaded index, which
+        would abort the process on FAISS's `is_owned` assertion.
+        """
+        if not self.index_path.exists():
+            return None
+        try:
+            return faiss.read_index(str(self.index_path))
+        except Exception as e:
+            print(f"[memory] ⚠️ Could not load index checkpoint, rebuilding from the store: {e}")
+            return None
+
+    def save_index(self, index: Optional[faiss.Index]):
+        if index is None:
+            return
+        tmp = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        faiss.write_index(index, str(tmp))
+        os.replace(tmp, self.index_path)  # readers see the old or the new file, never a partial one
+        self._since_checkpoint = 0
+
+    def maybe_checkpoint(self, index: faiss.Index, added: int):
+        self._since_checkpoint += added
+        if self._since_checkpoint >= self.checkpoint_every:
+            self.save_index(index)
+
+    def close(self, index: Optional[faiss.Index] = None):
+        if index is not None and self._since_checkpoint:
+            self.save_index(index)
+        with self._lock:
+            self._db.close()
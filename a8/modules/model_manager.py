@@ -1,23 +1,26 @@
 import os
 import json
-import yaml
-import requests
+import time
+import asyncio
 from pathlib import Path
+from typing import AsyncIterator, Optional, Dict, Tuple
 from google import genai
 from dotenv import load_dotenv
+from modules.llm_cache import LLMResponseCache
+from modules import http_pool
+from modules.rate_limit import get_limiter, is_rate_limited, backoff_delay
+from modules.config import get_config, ROOT
+from modules.usage import UsageRecord, record_usage, estimate_tokens, call_cost
 
 load_dotenv()
 
-ROOT = Path(__file__).parent.parent
-MODELS_JSON = ROOT / "config" / "models.json"
-PROFILE_YAML = ROOT / "config" / "profiles.yaml"
-
 class ModelManager:
-    def __init__(self):
-        self.config = json.loads(MODELS_JSON.read_text())
-        self.profile = yaml.safe_load(PROFILE_YAML.read_text())
+    def __init__(self, model_key: Optional[str] = None, cache: Optional[LLMResponseCache] = None):
+        registry = get_config()
+        self.config = registry.models
+        self.profile = registry.profile
 
-        self.text_model_key = self.profile["llm"]["text_generation"]
+        self.text_model_key = model_key or self.profile["llm"]["text_generation"]
         self.model_info = self.config["models"][self.text_model_key]
         self.model_type = self.model_info["type"]
 
@@ -26,20 +29,187 @@ class ModelManager:
             api_key = os.getenv("GEMINI_API_KEY")
             self.client = genai.Client(api_key=api_key)
 
-    async def generate_text(self, prompt: str) -> str:
+        # Anything that changes the reply for a given prompt belongs in the cache key
+        self.generation_params = {"model": self.model_info["model"]}
+        self.cache = cache or LLMResponseCache.from_config(self.profile["llm"].get("cache"), ROOT)
+        self.streaming = self.profile["llm"].get("stream", False)
+        # Shared by every manager/session using this model key in the process
+        self.limiter = get_limiter(
+            self.text_model_key, (self.profile["llm"].get("rate_limits") or {}).get(self.text_model_key)
+        )
+
+    def lookup_cache(self, prompt: str, role: Optional[str] = None) -> Optional[str]:
+        """Cached reply for the prompt, if any (recorded as a cached call in usage)."""
+        if self.cache is None:
+            return None
+        cached = self.cache.get(LLMResponseCache.make_key(self.text_model_key, prompt, self.generation_params))
+        if cached is not None:
+            self._record_usage(role, prompt, cached, {}, time.monotonic(), cached=True)
+        return cached
+
+    async def generate_text(self, prompt: str, role: Optional[str] = None, check_cache: bool = True) -> str:
+        """
+        Non-blocking: both backends are awaited natively, so the event loop stays free.
+        check_cache=False skips the lookup (the caller already did it) but still stores the reply.
+        """
+        if check_cache:
+            cached = self.lookup_cache(prompt, role)
+            if cached is not None:
+                return cached
+
+        started = time.monotonic()
+        usage: Dict[str, int] = {}
+        try:
+            text = await self._generate(prompt, usage)
+        except asyncio.CancelledError:
+            # e.g. the losing side of a hedged request: bill the prompt it already sent
+            self._record_usage(role, prompt, "", usage, started, cancelled=True)
+            raise
+        self._record_usage(role, prompt, text, usage, started)
+        if self.cache is not None:
+            self.cache.put(LLMResponseCache.make_key(self.text_model_key, prompt, self.generation_params), text)
+        return text
+
+    async def generate_stream(
+        self, prompt: str, role: Optional[str] = None, check_cache: bool = True
+    ) -> AsyncIterator[str]:
+        """
+        Yields the reply in chunks as the backend produces them.
+        Closing the generator early (aclose / break) cancels the upstream request;
+        only fully consumed replies are written to the cache.
+        """
+        if check_cache:
+            cached = self.lookup_cache(prompt, role)
+            if cached is not None:
+                yield cached
+                return
+
+        started = time.monotonic()
+
+        parts = []
+        usage: Dict[str, int] = {}
+        chunks, first = await self._start_stream(prompt, usage)
+        if first is None:
+            # Empty reply: nothing was yielded, but the call was still made
+            await chunks.aclose()
+            self._record_usage(role, prompt, "", usage, started)
+            return
+
+        try:
+            parts.append(first)
+            yield first
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+        finally:
+            await chunks.aclose()
+            # Early-stopped streams are still billed for what was generated so far
+            self._record_usage(role, prompt, "".join(parts), usage, started)
+
+        if self.cache is not None:
+            key = LLMResponseCache.make_key(self.text_model_key, prompt, self.generation_params)
+            self.cache.put(key, "".join(parts).strip())
+
+    def _record_usage(
+        self,
+        role: Optional[str],
+        prompt: str,
+        text: str,
+        usage: Dict[str, int],
+        started: float,
+        cached: bool = False,
+        cancelled: bool = False,
+    ):
+        if cached:
+            prompt_tokens = completion_tokens = 0
+            estimated = False
+        else:
+            estimated = "prompt_tokens" not in usage
+            prompt_tokens = usage.get("prompt_tokens") or estimate_tokens(prompt)
+            completion_tokens = usage.get("completion_tokens") or (estimate_tokens(text) if text else 0)
+        record_usage(UsageRecord(
+            model_key=self.text_model_key,
+            role=role,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            latency=time.monotonic() - started,
+            cost=call_cost(self.model_info.get("pricing"), prompt_tokens, completion_tokens),
+            cached=cached,
+            cancelled=cancelled,
+            estimated=estimated,
+        ))
+
+    def cache_stats(self) -> dict:
+        return dict(self.cache.stats) if self.cache else {}
+
+    async def _backoff_or_raise(self, error: Exception, attempt: int):
+        """Sleeps before the next attempt on a retryable 429; re-raises anything else."""
+        if not is_rate_limited(error) or attempt >= self.limiter.max_retries:
+            raise error
+        self.limiter.record_rate_limited()
+        delay = backoff_delay(attempt, self.limiter.backoff)
+        print(f"[llm] {self.text_model_key} rate limited (429), retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+    async def _generate(self, prompt: str, usage: Dict[str, int]) -> str:
+        """Waits for rate-limit admission, then calls the backend; 429s are retried with backoff."""
+        attempt = 0
+        while True:
+            await self.limiter.admit(prompt)
+            try:
+                return await self._generate_once(prompt, usage)
+            except Exception as e:
+                await self._backoff_or_raise(e, attempt)
+                attempt += 1
+
+    async def _start_stream(self, prompt: str, usage: Dict[str, int]) -> Tuple[AsyncIterator[str], Optional[str]]:
+        """
+        Opens a backend stream and waits for its first chunk, under the same
+        admission control and 429 backoff as `_generate`. A 429 always arrives
+        before any text, so retrying up to the first chunk never duplicates output.
+        Returns (stream, first chunk or None when the reply is empty).
+        """
+        attempt = 0
+        while True:
+            await self.limiter.admit(prompt)
+            usage.clear()  # a rejected attempt generated (and bills) nothing
+            if self.model_type == "gemini":
+                chunks = self._gemini_stream(prompt, usage)
+            elif self.model_type == "ollama":
+                chunks = self._ollama_stream(prompt, usage)
+            else:
+                raise NotImplementedError(f"Unsupported model type: {self.model_type}")
+            try:
+                return chunks, await chunks.__anext__()
+            except StopAsyncIteration:
+                return chunks, None
+            except Exception as e:
+                await chunks.aclose()
+                await self._backoff_or_raise(e, attempt)
+                attempt += 1
+
+    async def _generate_once(self, prompt: str, usage: Dict[str, int]) -> str:
         if self.model_type == "gemini":
-            return self._gemini_generate(prompt)
+            return await self._gemini_generate(prompt, usage)
 
         elif self.model_type == "ollama":
-            return self._ollama_generate(prompt)
+            return await self._ollama_generate(prompt, usage)
 
         raise NotImplementedError(f"Unsupported model type: {self.model_type}")
 
-    def _gemini_generate(self, prompt: str) -> str:
-        response = self.client.models.generate_content(
+    @staticmethod
+    def _gemini_usage(response, usage: Dict[str, int]):
+        meta = getattr(response, "usage_metadata", None)
+        if meta is not None and getattr(meta, "prompt_token_count", None) is not None:
+            usage["prompt_tokens"] = meta.prompt_token_count
+            usage["completion_tokens"] = getattr(meta, "candidates_token_count", None) or 0
+
+    async def _gemini_generate(self, prompt: str, usage: Dict[str, int]) -> str:
+        response = await self.client.aio.models.generate_content(
             model=self.model_info["model"],
             contents=prompt
         )
+        self._gemini_usage(response, usage)
 
         # ✅ Safely extract response text
         try:
@@ -50,10 +220,52 @@ class ModelManager:
             except Exception:
                 return str(response)
 
-    def _ollama_generate(self, prompt: str) -> str:
-        response = requests.post(
+    async def _gemini_stream(self, prompt: str, usage: Dict[str, int]) -> AsyncIterator[str]:
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.model_info["model"],
+            contents=prompt
+        )
+        try:
+            async for chunk in stream:
+                self._gemini_usage(chunk, usage)  # the last chunk carries the totals
+                text = getattr(chunk, "text", None)
+                if text:
+                    yield text
+        finally:
+            if hasattr(stream, "aclose"):
+                await stream.aclose()
+
+    @staticmethod
+    def _ollama_usage(data: dict, usage: Dict[str, int]):
+        if "prompt_eval_count" in data:
+            usage["prompt_tokens"] = data["prompt_eval_count"]
+            usage["completion_tokens"] = data.get("eval_count", 0)
+
+    async def _ollama_stream(self, prompt: str, usage: Dict[str, int]) -> AsyncIterator[str]:
+        async with http_pool.get_async_client().stream(
+            "POST",
             self.model_info["url"]["generate"],
-            json={"model": self.model_info["model"], "prompt": prompt, "stream": False}
+            json={"model": self.model_info["model"], "prompt": prompt, "stream": True}
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # skip malformed lines
+                if data.get("response"):
+                    yield data["response"]
+                if data.get("done", False):
+                    self._ollama_usage(data, usage)
+                    break
+
+    async def _ollama_generate(self, prompt: str, usage: Dict[str, int]) -> str:
+        data = await http_pool.post_json(
+            self.model_info["url"]["generate"],
+            {"model": self.model_info["model"], "prompt": prompt, "stream": False}
         )
-        response.raise_for_status()
-        return response.json()["response"].strip()
+        self._ollama_usage(data, usage)
+        return data["response"].strip()
+
@@ -0,0 +1,247 @@
+# modules/model_router.py → Multi-backend LLM Router
+# Role: Pick an LLM backend per agent layer, with latency-aware fallback and hedging.
+
+# Responsibilities:
+
+# Map roles (perception, decision, ...) to an ordered list of model keys from models.json
+
+# Track rolling p50/p95 latency and recent failures per backend
+
+# Fall back to the next backend on error; optionally hedge — fire the next backend
+# when the first exceeds its latency budget and take whichever answers first
+
+# Dependencies:
+
+# modules/model_manager.py, modules/config.py
+
+# Used by: perception.py, decision.py
+
+# modules/model_router.py
+
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Dict, List, Optional, AsyncIterator
+
+from modules.config import get_config, ROOT
+from modules.llm_cache import LLMResponseCache
+from modules.model_manager import ModelManager
+
+
+class LatencyTracker:
+    """Rolling latency window plus consecutive-failure count for one backend."""
+
+    def __init__(self, window: int = 100):
+        self.samples: deque = deque(maxlen=window)
+        self.failures = 0
+        self.last_failure = 0.0
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+        self.failures = 0
+
+    def record_cancelled(self, seconds: float):
+        """A call abandoned before replying: a lower bound on its latency, not a success."""
+        self.samples.append(seconds)
+
+    def record_failure(self):
+        self.failures += 1
+        self.last_failure = time.monotonic()
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        return {
+            "count": len(self.samples),
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "failures": self.failures,
+        }
+
+
+class ModelRouter:
+    def __init__(self):
+        registry = get_config()
+        self.config_version = registry.version
+        llm_config = registry.profile["llm"]
+        router_config = llm_config.get("router") or {}
+
+        self.default_key = llm_config["text_generation"]
+        self.routes: Dict[str, List[str]] = {
+            role: list(keys) for role, keys in (router_config.get("routes") or {}).items() if keys
+        }
+        self.hedge = router_config.get("hedge", False)
+        self.hedge_after = float(router_config.get("hedge_after", 8.0))
+        self.min_samples = int(router_config.get("min_samples", 5))
+        self.max_failures = int(router_config.get("max_failures", 3))
+        self.failure_cooldown = float(router_config.get("failure_cooldown", 60.0))
+        self.streaming = llm_config.get("stream", False)
+
+        # One cache for every backend; keys already include the model key
+        self.cache = LLMResponseCache.from_config(llm_config.get("cache"), ROOT)
+        self.managers: Dict[str, ModelManager] = {}
+        self.latency: Dict[str, LatencyTracker] = {}
+        self.first_chunk: Dict[str, LatencyTracker] = {}
+
+    def manager(self, model_key: str) -> ModelManager:
+        if model_key not in self.managers:
+            self.managers[model_key] = ModelManager(model_key, cache=self.cache)
+            self.latency[model_key] = LatencyTracker()
+            self.first_chunk[model_key] = LatencyTracker()  # streams: kept apart from full-reply latency
+        return self.managers[model_key]
+
+    def candidates(self, role: Optional[str]) -> List[str]:
+        """Configured backends for the role, with backends that keep failing moved to the end."""
+        keys = self.routes.get(role or "", []) or [self.default_key]
+        now = time.monotonic()
+
+        def cooling_down(key: str) -> bool:
+            tracker = self.latency.get(key)
+            return bool(
+                tracker
+                and tracker.failures >= self.max_failures
+                and now - tracker.last_failure < self.failure_cooldown
+            )
+
+        return [k for k in keys if not cooling_down(k)] + [k for k in keys if cooling_down(k)]
+
+    def hedge_budget(self, model_key: str) -> float:
+        """Observed p95 once there is enough history, else the configured `hedge_after`."""
+        tracker = self.latency.get(model_key)
+        if tracker and len(tracker.samples) >= self.min_samples:
+            return tracker.percentile(0.95)
+        return self.hedge_after
+
+    async def _timed(self, model_key: str, prompt: str, role: Optional[str] = None) -> str:
+        manager = self.manager(model_key)
+        # Cache hits are not latency samples: near-zero hits would shrink p95 and trigger hedging constantly
+        cached = manager.lookup_cache(prompt, role)
+        if cached is not None:
+            return cached
+        budget = self.hedge_budget(model_key)
+        started = time.monotonic()
+        try:
+            text = await manager.generate_text(prompt, role=role, check_cache=False)
+        except asyncio.CancelledError:
+            # Usually a hedge loser. Dropping it would leave p95 to the fast winners only, so the
+            # budget would keep shrinking; its true latency is at least what it ran, and its budget.
+            self.latency[model_key].record_cancelled(max(time.monotonic() - started, budget))
+            raise
+        except Exception:
+            self.latency[model_key].record_failure()
+            raise
+        self.latency[model_key].record(time.monotonic() - started)
+        return text
+
+    async def generate_text(self, prompt: str, role: Optional[str] = None) -> str:
+        keys = self.candidates(role)
+        if self.hedge and len(keys) > 1:
+            return await self._hedged(prompt, keys, role)
+
+        last_error: Optional[Exception] = None
+        for key in keys:
+            try:
+                return await self._timed(key, prompt, role)
+            except Exception as e:
+                print(f"[router] ⚠️ {key} failed for {role or 'default'}: {e}")
+                last_error = e
+        raise last_error
+
+    async def _hedged(self, prompt: str, keys: List[str], role: Optional[str] = None) -> str:
+        """
+        Starts the first backend; whenever the newest attempt outlives its budget
+        (or fails), the next backend is started too. First success wins, the
+        rest are cancelled.
+        """
+        pending: Dict[asyncio.Task, str] = {}
+        remaining = list(keys)
+        last_error: Optional[Exception] = None
+
+        def launch():
+            key = remaining.pop(0)
+            pending[asyncio.create_task(self._timed(key, prompt, role))] = key
+            return key
+
+        current = launch()
+        try:
+            while pending:
+                timeout = self.hedge_budget(current) if remaining else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    print(f"[router] {current} exceeded {timeout:.2f}s budget, hedging with {remaining[0]}")
+                    current = launch()
+                    continue
+                for task in done:
+                    key = pending.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                    print(f"[router] ⚠️ {key} failed: {last_error}")
+                if remaining and (not pending or current not in pending.values()):
+                    current = launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise last_error or RuntimeError("No LLM backend available")
+
+    async def generate_stream(self, prompt: str, role: Optional[str] = None) -> AsyncIterator[str]:
+        """Streams from the first backend that starts producing; falls back only before the first chunk."""
+        last_error: Optional[Exception] = None
+        for key in self.candidates(role):
+            manager = self.manager(key)
+            cached = manager.lookup_cache(prompt, role)
+            if cached is not None:
+                yield cached
+                return
+            stream = manager.generate_stream(prompt, role=role, check_cache=False)
+            started = time.monotonic()
+            yielded = False
+            try:
+                async for chunk in stream:
+                    if not yielded:
+                        # Readers stop early by design, so time-to-first-chunk is the sample we can rely on
+                        self.first_chunk[key].record(time.monotonic() - started)
+                        yielded = True
+                    yield chunk
+                return
+            except Exception as e:
+                self.latency[key].record_failure()
+                if yielded:
+                    raise
+                print(f"[router] ⚠️ {key} stream failed: {e}")
+                last_error = e
+            finally:
+                await stream.aclose()
+        raise last_error or RuntimeError("No LLM backend available")
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters of the response cache shared by every backend."""
+        return dict(self.cache.stats) if self.cache else {}
+
+    def latency_report(self) -> Dict[str, Dict[str, Dict[str, Optional[float]]]]:
+        return {
+            key: {"reply": tracker.summary(), "first_chunk": self.first_chunk[key].summary()}
+            for key, tracker in self.latency.items()
+        }
+
+
+_shared: Optional[ModelRouter] = None
+_shared_lock = threading.Lock()
+
+
+def get_router() -> ModelRouter:
+    """Process-wide router; rebuilt when the config registry reloads."""
+    global _shared
+    registry = get_config()
+    registry.maybe_reload()
+    with _shared_lock:
+        if _shared is None or _shared.config_version != registry.version:
+            previous, _shared = _shared, ModelRouter()
+            if previous is not None and previous.cache is not None:
+                previous.cache.close()
+        return _shared
@@ -1,14 +1,14 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple, Any
 from pydantic import BaseModel
 import os
 import re
 import json
 from dotenv import load_dotenv
-from modules.model_manager import ModelManager
+from modules.model_router import get_router
 from modules.tools import summarize_tools
 
-model = ModelManager()
-tool_context = summarize_tools(model.get_all_tools()) if hasattr(model, "get_all_tools") else ""
+# The LLM layer has no tool list of its own, so this stays empty
+tool_context = ""
 
 
 class PerceptionResult(BaseModel):
@@ -18,6 +18,37 @@ class PerceptionResult(BaseModel):
     tool_hint: Optional[str] = None
 
 
+def parse_perception(response: str, user_input: str) -> PerceptionResult:
+    """Parses the LLM's perception dict; raises ValueError when there is nothing usable."""
+    # Clean up raw if wrapped in markdown-style ```json
+    raw = response.strip()
+    if not raw or raw.lower() in ["none", "null", "undefined"]:
+        raise ValueError("Empty or null model output")
+
+    # Clean and parse
+    clean = re.sub(r"^```json|```$", "", raw, flags=re.MULTILINE).strip()
+
+    try:
+        parsed = json.loads(clean.replace("null", "null"))  # Clean up non-Python nulls
+    except Exception as json_error:
+        print(f"[perception] JSON parsing failed: {json_error}")
+        parsed = {}
+
+    # Ensure Keys
+    if not isinstance(parsed, dict):
+        raise ValueError("Parsed LLM output is not a dict")
+    if "user_input" not in parsed:
+        parsed["user_input"] = user_input
+    if "intent" not in parsed:
+        parsed['intent'] = None
+    # Fix common issues
+    if isinstance(parsed.get("entities"), dict):
+        parsed["entities"] = list(parsed["entities"].values())
+
+    parsed["user_input"] = user_input  # overwrite or insert safely
+    return PerceptionResult(**parsed)
+
+
 async def extract_perception(user_input: str) -> PerceptionResult:
     """
     Uses LLMs to extract structured info:
@@ -43,38 +74,38 @@ Output only the dictionary on a single line. Do NOT wrap it in ```json or other
 """
 
     try:
-        response = await model.generate_text(prompt)
-
-        # Clean up raw if wrapped in markdown-style ```json
-        raw = response.strip()
-        if not raw or raw.lower() in ["none", "null", "undefined"]:
-            raise ValueError("Empty or null model output")
-
-        # Clean and parse
-        clean = re.sub(r"^```json|```$", "", raw, flags=re.MULTILINE).strip()
-        import json
-
-        try:
-            parsed = json.loads(clean.replace("null", "null"))  # Clean up non-Python nulls
-        except Exception as json_error:
-            print(f"[perception] JSON parsing failed: {json_error}")
-            parsed = {}
-
-        # Ensure Keys
-        if not isinstance(parsed, dict):
-            raise ValueError("Parsed LLM output is not a dict")
-        if "user_input" not in parsed:
-            parsed["user_input"] = user_input
-        if "intent" not in parsed:
-            parsed['intent'] = None
-        # Fix common issues
-        if isinstance(parsed.get("entities"), dict):
-            parsed["entities"] = list(parsed["entities"].values())
-
-        parsed["user_input"] = user_input  # overwrite or insert safely
-        return PerceptionResult(**parsed)
-
+        response = await get_router().generate_text(prompt, role="perception")
+        return parse_perception(response, user_input)
 
     except Exception as e:
         print(f"[perception] ⚠️ LLM perception failed: {e}")
         return PerceptionResult(user_input=user_input)
+
+
+# Tool results that usually mean the current line of attack is not working
+CHANGE_OF_DIRECTION_MARKERS = ("error:", "no result", "not found", "no matches", "unknown", "failed")
+
+
+def perception_is_stale(perception: Optional[PerceptionResult], results: List[Tuple[str, Any, Any]]) -> bool:
+    """
+    Cheap, LLM-free check on the last step's (tool_name, arguments, result) triples.
+    Perception is re-run only when there is none yet, or a result is empty or
+    reads like a failure — a hint that the task needs a different approach.
+    """
+    if perception is None or perception.intent is None:
+        return True
+    for _, _, result in results:
+        text = str(result).strip().lower()
+        if not text or any(marker in text[:200] for marker in CHANGE_OF_DIRECTION_MARKERS):
+            return True
+    return False
+
+
+def carry_perception(perception: PerceptionResult, user_input: str, results: List[Tuple[str, Any, Any]]) -> PerceptionResult:
+    """
+    Incremental update instead of a new LLM call: keeps intent and entities,
+    takes the new step input, and drops a tool hint that has just been acted on.
+    """
+    used = {tool_name for tool_name, _, _ in results}
+    tool_hint = None if perception.tool_hint in used else perception.tool_hint
+    return perception.model_copy(update={"user_input": user_input, "tool_hint": tool_hint})
@@ -0,0 +1,171 @@
+# modules/rate_limit.py → Client-side Rate Limiting
+# Role: Token-bucket admission control in front of quota-limited LLM APIs (e.g. Gemini).
+
+# Responsibilities:
+
+# Requests-per-minute and tokens-per-minute buckets, one limiter per model key per process
+
+# Queue callers in arrival order instead of letting them fail on quota errors
+
+# Detect 429s and compute exponential backoff; record queue-wait metrics
+
+# Dependencies:
+
+# asyncio (stdlib)
+
+# Used by: model_manager.py
+
+# modules/rate_limit.py
+
+import time
+import random
+import asyncio
+import threading
+from typing import Dict, Any, Optional
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token); good enough for admission control."""
+    return max(1, len(text) // 4)
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """True for HTTP 429 errors from google-genai (APIError.code) or httpx (response.status_code)."""
+    if getattr(error, "code", None) == 429:
+        return True
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+
+def backoff_delay(attempt: int, base: float, cap: float = 60.0) -> float:
+    """Exponential backoff with jitter: base * 2^attempt, +/- 25%, capped."""
+    return min(cap, base * (2 ** attempt)) * random.uniform(0.75, 1.25)
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.rate = self.capacity / 60.0  # refill per second
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)  # oversized requests wait for a full bucket, not forever
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        max_retries: int = 5,
+        backoff: float = 2.0,
+        output_reserve: int = 256,
+    ):
+        self.config: Optional[Dict[str, Any]] = None  # profile entry last applied by get_limiter
+        self.configure(rpm, tpm, max_retries, backoff, output_reserve)
+        self._lock = asyncio.Lock()  # callers are admitted strictly in arrival order
+        self.queue_depth = 0
+        self.stats: Dict[str, Any] = {
+            "admitted": 0,
+            "queued": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0,
+            "max_queue_depth": 0,
+            "rate_limited": 0,  # 429s seen despite admission control
+        }
+
+    def configure(
+        self,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        max_retries: int = 5,
+        backoff: float = 2.0,
+        output_reserve: int = 256,
+    ):
+        self.output_reserve = output_reserve  # completion tokens counted against TPM up front
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    async def admit(self, prompt: str):
+        await self.acquire(estimate_tokens(prompt) + self.output_reserve)
+
+    async def acquire(self, tokens: int = 1):
+        self.queue_depth += 1
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self.queue_depth)
+        started = time.monotonic()
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    wait = max(
+                        self.requests.wait_time(1, now) if self.requests else 0.0,
+                        self.tokens.wait_time(tokens, now) if self.tokens else 0.0,
+                    )
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(wait)
+                if self.requests:
+                    self.requests.take(1)
+                if self.tokens:
+                    self.tokens.take(tokens)
+        finally:
+            self.queue_depth -= 1
+
+        waited = time.monotonic() - started
+        self.stats["admitted"] += 1
+        if waited > 0.01:
+            self.stats["queued"] += 1
+        self.stats["total_wait"] += waited
+        self.stats["max_wait"] = max(self.stats["max_wait"], waited)
+
+    def record_rate_limited(self):
+        self.stats["rate_limited"] += 1
+
+    def summary(self) -> Dict[str, Any]:
+        admitted = self.stats["admitted"]
+        return {**self.stats, "avg_wait": self.stats["total_wait"] / admitted if admitted else 0.0}
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(model_key: str, config: Optional[Dict[str, Any]]) -> RateLimiter:
+    """
+    Process-wide limiter for a model key, shared by every session and manager.
+    `config` is the model's entry under llm.rate_limits in profiles.yaml; with no
+    entry the limiter only provides 429 backoff.
+    """
+    config = dict(config or {})
+    with _limiters_lock:
+        limiter = _limiters.get(model_key)
+        if limiter is None:
+            limiter = _limiters[model_key] = RateLimiter()
+        if limiter.config != config:
+            # First use, or the profile was hot-reloaded with new limits
+            limiter.configure(
+                rpm=config.get("rpm"),
+                tpm=config.get("tpm"),
+                max_retries=config.get("max_retries", 5),
+                backoff=config.get("backoff", 2.0),
+                output_reserve=config.get("output_reserve", 256),
+            )
+            limiter.config = config
+        return limiter
+
+
+def limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-model admission metrics (admitted, queued, waits, 429s seen); logged by agent.py at exit."""
+    return {key: limiter.summary() for key, limiter in _limiters.items()}
@@ -0,0 +1,102 @@
+# modules/usage.py → LLM Token, Latency & Cost Accounting
+# Role: Record every LLM call (tokens, latency, cost) against the agent session that made it.
+
+# Responsibilities:
+
+# UsageRecord per call: model, layer (role), step, prompt/completion tokens, latency, cache hit
+
+# UsageTracker per session with per-step / per-role / per-model summaries
+
+# A context variable routes records from the shared ModelManager to the active session,
+# so concurrent sessions in one process never mix their numbers
+
+# Dependencies:
+
+# pydantic, contextvars (stdlib)
+
+# Used by: model_manager.py, context.py, loop.py
+
+# modules/usage.py
+
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Any
+from pydantic import BaseModel
+from modules.rate_limit import estimate_tokens  # re-exported for callers without usage metadata
+
+
+class UsageRecord(BaseModel):
+    model_key: str
+    role: Optional[str] = None
+    step: Optional[int] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency: float = 0.0
+    cost: float = 0.0
+    cached: bool = False
+    cancelled: bool = False  # abandoned mid-call (e.g. a losing hedge); tokens partly estimated
+    estimated: bool = False  # token counts estimated locally (no usage metadata from the backend)
+
+
+class UsageTracker:
+    def __init__(self):
+        self.records: List[UsageRecord] = []
+        self.step: Optional[int] = None
+
+    def record(self, record: UsageRecord):
+        if record.step is None:
+            record.step = self.step
+        self.records.append(record)
+
+    @staticmethod
+    def _totals(records: List[UsageRecord]) -> Dict[str, Any]:
+        return {
+            "calls": len(records),
+            "cached_calls": sum(r.cached for r in records),
+            "cancelled_calls": sum(r.cancelled for r in records),
+            "prompt_tokens": sum(r.prompt_tokens for r in records),
+            "completion_tokens": sum(r.completion_tokens for r in records),
+            "latency": round(sum(r.latency for r in records), 3),
+            "cost": round(sum(r.cost for r in records), 6),
+        }
+
+    def _group(self, field: str) -> Dict[str, Dict[str, Any]]:
+        groups: Dict[str, List[UsageRecord]] = {}
+        for r in self.records:
+            groups.setdefault(str(getattr(r, field)), []).append(r)
+        return {key: self._totals(records) for key, records in groups.items()}
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total": self._totals(self.records),
+            "by_role": self._group("role"),
+            "by_model": self._group("model_key"),
+            "by_step": self._group("step"),
+        }
+
+
+_current: ContextVar[Optional[UsageTracker]] = ContextVar("llm_usage_tracker", default=None)
+
+
+def set_tracker(tracker: Optional[UsageTracker]):
+    """Routes LLM usage in the current task (and tasks it spawns) to `tracker`."""
+    return _current.set(tracker)
+
+
+def reset_tracker(token):
+    _current.reset(token)
+
+
+def record_usage(record: UsageRecord):
+    tracker = _current.get()
+    if tracker is not None:
+        tracker.record(record)
+
+
+def call_cost(pricing: Optional[Dict[str, float]], prompt_tokens: int, completion_tokens: int) -> float:
+    """Cost from models.json `pricing` (USD per million input/output tokens); 0 when unpriced."""
+    if not pricing:
+        return 0.0
+    return (
+        prompt_tokens * pricing.get("input_per_million", 0.0)
+        + completion_tokens * pricing.get("output_per_million", 0.0)
+    ) / 1_000_000
@@ -0,0 +1,20 @@
+# tests/conftest.py → Shared test setup
+# Tests import the agent's packages (core, modules) the way agent.py does: from the a8 root.
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def vectors():
+    """Deterministic float32 vectors: vectors(n, dim)."""
+    def make(n: int, dim: int = 16, seed: int = 0) -> np.ndarray:
+        return np.random.default_rng(seed).random((n, dim)).astype(np.float32)
+    return make
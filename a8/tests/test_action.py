@@ -0,0 +1,34 @@
+import pytest
+
+from modules.action import parse_function_calls
+
+
+def test_single_call():
+    assert parse_function_calls('FUNCTION_CALL: add|{"a": 5, "b": 3}') == [("add", {"a": 5, "b": 3})]
+
+
+def test_several_calls_keep_plan_order():
+    plan = (
+        'FUNCTION_CALL: search_documents|{"query": "Gensol"}\n'
+        "\n"
+        "  FUNCTION_CALL: search_documents|{'query': 'Go-Auto'}\n"
+    )
+    assert parse_function_calls(plan) == [
+        ("search_documents", {"query": "Gensol"}),
+        ("search_documents", {"query": "Go-Auto"}),
+    ]
+
+
+def test_ignores_lines_that_are_not_calls():
+    plan = 'Thinking...\nFUNCTION_CALL: add|{"a": 1, "b": 2}'
+    assert parse_function_calls(plan) == [("add", {"a": 1, "b": 2})]
+
+
+def test_no_call_raises():
+    with pytest.raises(ValueError):
+        parse_function_calls("FINAL_ANSWER: [42]")
+
+
+def test_bad_arguments_raise():
+    with pytest.raises(ValueError):
+        parse_function_calls("FUNCTION_CALL: add|{not json")
@@ -0,0 +1,67 @@
+import faiss
+import numpy as np
+import pytest
+
+from modules import ann_index
+
+SMALL = {"min_vectors": 100, "nlist": 8, "pq_m": 4, "pq_bits": 4, "hnsw_m": 8, "ef_construction": 40}
+
+
+def test_settings_fall_back_to_flat():
+    assert ann_index.settings(None)["type"] == "flat"
+    assert ann_index.settings({"type": "annoy"})["type"] == "flat"
+    assert ann_index.settings({"type": "hnsw", "nprobe": 4})["nprobe"] == 4
+
+
+def test_desired_kind_waits_for_enough_vectors():
+    config = ann_index.settings({**SMALL, "type": "ivf_pq"})
+    assert ann_index.desired_kind(config, 50) == "flat"
+    assert ann_index.desired_kind(config, 200) == "flat"  # too few to train 16 PQ centroids per list
+    assert ann_index.desired_kind(config, 1000) == "ivf_pq"
+    assert ann_index.desired_kind(ann_index.settings({**SMALL, "type": "hnsw"}), 100) == "hnsw"
+    assert ann_index.desired_kind(ann_index.settings({**SMALL, "type": "flat"}), 10 ** 6) == "flat"
+
+
+@pytest.mark.parametrize("kind, index_type", [
+    ("flat", faiss.IndexFlatL2),
+    ("hnsw", faiss.IndexHNSWFlat),
+    ("ivf_flat", faiss.IndexIVFFlat),
+    ("ivf_pq", faiss.IndexIVFPQ),
+])
+def test_build_each_kind(kind, index_type, vectors):
+    data = vectors(1000, dim=16)
+    config = ann_index.settings({**SMALL, "type": kind})
+    index = ann_index.build_index(kind, data, config)
+
+    assert isinstance(index, index_type)
+    assert ann_index.index_kind(index) == kind
+    assert index.ntotal == len(data)
+
+    _, ids = index.search(data[:5], 1, params=ann_index.search_params(index, config))
+    if kind != "ivf_pq":  # PQ codes are lossy; the others find each stored vector itself
+        assert list(ids[:, 0]) == [0, 1, 2, 3, 4]
+
+    report = ann_index.recall_report(index, data, config, sample=20, top_k=5)
+    assert report["type"] == kind and report["ntotal"] == 1000
+    assert 0 <= report["recall@5"] <= 1
+
+
+@pytest.mark.parametrize("kind", ["flat", "hnsw", "ivf_flat"])
+def test_search_params_carry_id_selector(kind, vectors):
+    data = vectors(1000, dim=16)
+    config = ann_index.settings({**SMALL, "type": kind})
+    index = ann_index.build_index(kind, data, config)
+    allowed = np.array([10, 20, 30], dtype=np.int64)
+
+    params = ann_index.search_params(index, config, faiss.IDSelectorBatch(allowed))
+    _, ids = index.search(data[:1], 3, params=params)
+    assert set(ids[0]) <= set(allowed)
+
+
+def test_tune_applies_query_knobs(vectors):
+    config = ann_index.settings({**SMALL, "ef_search": 99, "nprobe": 3})
+    hnsw = ann_index.build_index("hnsw", vectors(200, dim=16), config)
+    ivf = ann_index.build_index("ivf_flat", vectors(1000, dim=16), config)
+    assert hnsw.hnsw.efSearch == 99
+    assert faiss.extract_index_ivf(ivf).nprobe == 3
+    assert ann_index.search_params(ann_index.build_index("flat", vectors(10, dim=16), config), config) is None
@@ -0,0 +1,63 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from modules import decision
+
+
+class StreamingRouter:
+    """Stands in for ModelRouter.generate_stream; records how much of the reply was read."""
+
+    def __init__(self, chunks: List[str]):
+        self.chunks = chunks
+        self.sent = 0
+        self.closed = False
+
+    async def generate_stream(self, prompt: str, role=None):
+        try:
+            for chunk in self.chunks:
+                self.sent += 1
+                yield chunk
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def router(monkeypatch):
+    def install(chunks: List[str]) -> StreamingRouter:
+        fake = StreamingRouter(chunks)
+        monkeypatch.setattr(decision, "get_router", lambda: fake)
+        return fake
+    return install
+
+
+def test_stops_at_final_answer(router):
+    fake = router(["FINAL_ANS", "WER: [4]\n", "FUNCTION_CALL: add|{}\n", "trailing"])
+    assert asyncio.run(decision.read_plan_stream("p")) == "FINAL_ANSWER: [4]"
+    assert fake.sent == 2
+    assert fake.closed
+
+
+def test_stops_after_max_calls(router):
+    fake = router([
+        'FUNCTION_CALL: a|{"q": 1}\nFUNCTION_CALL: b|{"q": 2}\n',
+        "FUNCTION_CALL: c|{}\n",
+        "FINAL_ANSWER: [x]\n",
+    ])
+    plan = asyncio.run(decision.read_plan_stream("p", max_calls=2))
+    assert plan == 'FUNCTION_CALL: a|{"q": 1}\nFUNCTION_CALL: b|{"q": 2}'
+    assert fake.sent == 1
+    assert fake.closed
+
+
+def test_final_answer_after_a_call_does_not_stop(router):
+    router(["FUNCTION_CALL: a|{}\n", "FINAL_ANSWER: [x]\n", "FUNCTION_CALL: b|{}\n"])
+    plan = asyncio.run(decision.read_plan_stream("p", max_calls=2))
+    assert plan.splitlines() == ["FUNCTION_CALL: a|{}", "FINAL_ANSWER: [x]", "FUNCTION_CALL: b|{}"]
+
+
+def test_unterminated_reply_is_returned_whole(router):
+    fake = router(["FINAL_ANSWER:", " [4]"])
+    assert asyncio.run(decision.read_plan_stream("p")).strip() == "FINAL_ANSWER: [4]"
+    assert fake.sent == 2
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from modules.embedding_cache import EmbeddingCache
+
+
+def test_embedding_cache_memory_lru():
+    cache = EmbeddingCache(max_entries=2)
+    for i, text in enumerate("abc"):
+        cache.put("nomic", text, np.full(4, i))
+    assert cache.get("nomic", "a") is None
+    np.testing.assert_array_equal(cache.get("nomic", "c"), np.full(4, 2, dtype=np.float32))
+    assert cache.stats["evictions"] == 1
+
+
+def test_embedding_cache_key_includes_model():
+    cache = EmbeddingCache()
+    cache.put("nomic", "text", np.ones(4))
+    assert cache.get("nomic#embed", "text") is None
+    assert cache.get("nomic", "text") is not None
+
+
+def test_embedding_cache_vectors_are_read_only_float32():
+    cache = EmbeddingCache()
+    stored = cache.put("nomic", "text", [1, 2, 3])
+    assert stored.dtype == np.float32
+    with pytest.raises(ValueError):
+        stored[0] = 5
+    assert cache.get("nomic", "text") is stored
+
+
+def test_embedding_cache_disk_tier_survives_restart(tmp_path):
+    db = tmp_path / "embeddings.sqlite"
+    vector = np.arange(8, dtype=np.float32)
+    EmbeddingCache(db_path=db).put("nomic", "text", vector)
+
+    reopened = EmbeddingCache(db_path=db)
+    np.testing.assert_array_equal(reopened.get("nomic", "text"), vector)
+    assert reopened.stats["disk_hits"] == 1
+    reopened.get("nomic", "text")
+    assert reopened.stats["disk_hits"] == 1  # second read served from memory
+
+
+def test_embedding_cache_disk_eviction_keeps_recent(tmp_path):
+    cache = EmbeddingCache(max_entries=1, db_path=tmp_path / "embeddings.sqlite", max_disk_entries=50)
+    for i in range(150):
+        cache.put("nomic", f"t{i}", np.full(2, i))
+    reopened = EmbeddingCache(db_path=tmp_path / "embeddings.sqlite")
+    assert reopened.get("nomic", "t0") is None
+    assert reopened.get("nomic", "t149") is not None
+
+
+def test_embedding_cache_clear(tmp_path):
+    cache = EmbeddingCache(db_path=tmp_path / "embeddings.sqlite")
+    cache.put("nomic", "text", np.ones(2))
+    cache.clear()
+    assert cache.get("nomic", "text") is None
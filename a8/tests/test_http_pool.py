@@ -0,0 +1,35 @@
+import asyncio
+
+import httpx
+import pytest
+
+from modules import http_pool
+from modules.rate_limit import is_rate_limited
+
+
+def test_post_json_never_resends_a_generate_call(monkeypatch):
+    sent = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(request)
+        return httpx.Response(429 if len(sent) == 1 else 200, json={"response": "ok"})
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            monkeypatch.setattr(http_pool, "get_async_client", lambda: client)
+            with pytest.raises(httpx.HTTPStatusError) as raised:
+                await http_pool.post_json("http://ollama/api/generate", {"prompt": "hi"})
+            assert is_rate_limited(raised.value)  # left to ModelManager's limiter backoff
+            assert await http_pool.post_json("http://ollama/api/generate", {"prompt": "hi"}) == {"response": "ok"}
+
+    asyncio.run(scenario())
+    assert len(sent) == 2
+
+
+def test_sync_sessions_only_retry_posts_when_asked():
+    plain = http_pool.get_sync_session().get_adapter("http://ollama").max_retries
+    embed = http_pool.get_sync_session(retry_post=True).get_adapter("http://ollama").max_retries
+    assert not plain.is_retry("POST", 503)
+    assert plain.is_retry("GET", 503)
+    assert embed.is_retry("POST", 503)
+    assert http_pool.get_sync_session() is http_pool.get_sync_session()
@@ -0,0 +1,74 @@
+import time
+
+from modules.llm_cache import LLMResponseCache
+
+
+def test_llm_cache_key_depends_on_model_prompt_and_params():
+    key = LLMResponseCache.make_key("gemini", "hello")
+    assert key == LLMResponseCache.make_key("gemini", "hello")
+    assert key != LLMResponseCache.make_key("phi4", "hello")
+    assert key != LLMResponseCache.make_key("gemini", "hello!")
+    assert key != LLMResponseCache.make_key("gemini", "hello", {"temperature": 0.5})
+
+
+def test_llm_cache_memory_lru():
+    cache = LLMResponseCache(max_entries=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"  # a is now most recent
+    cache.put("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.stats["evictions"] == 1
+    assert cache.stats["misses"] == 1
+
+
+def test_llm_cache_disk_tier_survives_restart(tmp_path):
+    db = tmp_path / "llm.sqlite"
+    first = LLMResponseCache(max_entries=1, db_path=db)
+    first.put("a", "A")
+    first.put("b", "B")  # evicts a from memory only
+    assert first.get("a") == "A"
+    assert first.stats["disk_hits"] == 1
+    first.close()
+
+    second = LLMResponseCache(db_path=db)
+    assert second.get("b") == "B"
+    assert second.stats == {"hits": 1, "disk_hits": 1, "misses": 0, "evictions": 0}
+    assert second.get("b") == "B"  # promoted to the memory tier
+    assert second.stats["disk_hits"] == 1
+    second.close()
+
+
+def test_llm_cache_disk_tier_is_bounded(tmp_path):
+    cache = LLMResponseCache(max_entries=1, db_path=tmp_path / "llm.sqlite", max_disk_entries=2)
+    for key in "abc":
+        cache.put(key, key.upper())
+    cache.close()
+    reopened = LLMResponseCache(db_path=tmp_path / "llm.sqlite")
+    assert [reopened.get(key) for key in "abc"] == [None, "B", "C"]
+
+
+def test_llm_cache_entries_expire(tmp_path):
+    cache = LLMResponseCache(ttl_seconds=0.05, db_path=tmp_path / "llm.sqlite")
+    cache.put("a", "A")
+    assert cache.get("a") == "A"
+    time.sleep(0.1)
+    assert cache.get("a") is None
+
+
+def test_llm_cache_from_config(tmp_path):
+    assert LLMResponseCache.from_config(None, tmp_path) is None
+    assert LLMResponseCache.from_config({"enabled": False}, tmp_path) is None
+    cache = LLMResponseCache.from_config({"enabled": True, "memory_entries": 8, "disk_path": "c/llm.sqlite"}, tmp_path)
+    assert cache.max_entries == 8
+    assert (tmp_path / "c" / "llm.sqlite").exists()
+    cache.close()
+
+
+def test_llm_cache_close_keeps_memory_tier(tmp_path):
+    cache = LLMResponseCache(db_path=tmp_path / "llm.sqlite")
+    cache.put("a", "A")
+    cache.close()
+    cache.put("b", "B")
+    assert cache.get("a") == "A" and cache.get("b") == "B"
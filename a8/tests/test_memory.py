@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from modules.embedding_cache import EmbeddingCache
+from modules.memory import MemoryItem, MemoryManager
+
+
+class Embedder:
+    """Stands in for the embedding endpoint: fixed vectors per text, records every request."""
+
+    def __init__(self, dim: int = 8):
+        self.dim = dim
+        self.vectors = {}
+        self.batches = []
+        self.singles = []
+
+    def vector(self, text: str) -> np.ndarray:
+        if text not in self.vectors:
+            seed = sum(map(ord, text)) * 31 + len(text)
+            self.vectors[text] = np.random.default_rng(seed).random(self.dim).astype(np.float32)
+        return self.vectors[text]
+
+    def batch(self, texts):
+        self.batches.append(list(texts))
+        return np.stack([self.vector(text) for text in texts])
+
+    def single(self, text):
+        self.singles.append(text)
+        return self.vector(text)
+
+
+@pytest.fixture
+def embedder(monkeypatch):
+    fake = Embedder()
+    monkeypatch.setattr(MemoryManager, "_request_embedding", lambda manager, text: fake.single(text))
+    return fake
+
+
+def test_bulk_add_batches_and_deduplicates(monkeypatch, embedder):
+    monkeypatch.setattr(MemoryManager, "_request_embeddings", lambda manager, texts: embedder.batch(texts))
+    memory = MemoryManager("http://unused", use_cache=False, batch_url="http://unused/api/embed", batch_size=3)
+    texts = ["a", "b", "a", "c", "d", "b", "e"]
+    memory.bulk_add([MemoryItem(text=text) for text in texts])
+
+    assert embedder.batches == [["a", "b", "c"], ["d", "e"]]  # 5 distinct texts, batch_size 3
+    assert memory.index.ntotal == len(texts)
+    assert [item.text for item in memory.data] == texts
+    np.testing.assert_array_equal(memory.index.reconstruct(2), embedder.vector("a"))
+
+
+def test_bulk_add_skips_cached_texts(monkeypatch, embedder):
+    monkeypatch.setattr(MemoryManager, "_request_embeddings", lambda manager, texts: embedder.batch(texts))
+    memory = MemoryManager("http://unused", cache=EmbeddingCache(), batch_size=8)
+    memory.bulk_add([MemoryItem(text=text) for text in ["a", "b"]])
+    memory.bulk_add([MemoryItem(text=text) for text in ["b", "c", "a"]])
+    assert embedder.batches == [["a", "b"], ["c"]]
+
+
+def test_without_batch_endpoint_requests_run_per_text(embedder):
+    memory = MemoryManager("http://unused", use_cache=False, max_concurrency=4)
+    memory.bulk_add([MemoryItem(text=text) for text in ["a", "b", "a", "c"]])
+    assert sorted(embedder.singles) == ["a", "b", "c"]
+    assert memory.index.ntotal == 4
+
+
+@pytest.fixture
+def sessions(embedder):
+    """Session "near" holds 3 memories far from the query; "far" holds 20 that are closer."""
+    embedder.vectors["query"] = np.zeros(embedder.dim, dtype=np.float32)
+    items = []
+    for i in range(20):
+        embedder.vectors[f"other {i}"] = np.full(embedder.dim, 0.01 * (i + 1), dtype=np.float32)
+        items.append(MemoryItem(text=f"other {i}", session_id="far", type="fact", tags=["misc"]))
+    for i in range(3):
+        embedder.vectors[f"mine {i}"] = np.full(embedder.dim, 1.0 + i, dtype=np.float32)
+        items.append(MemoryItem(text=f"mine {i}", session_id="near", type="tool_output", tags=["add"]))
+    memory = MemoryManager("http://unused", use_cache=False)
+    memory.bulk_add(items)
+    return memory
+
+
+@pytest.mark.parametrize("exact_filter_limit", [4096, 0])  # exact scoring of candidates / FAISS ID selector
+def test_filtered_retrieve_returns_top_k_from_the_session(sessions, exact_filter_limit):
+    sessions.exact_filter_limit = exact_filter_limit
+    found = sessions.retrieve("query", top_k=2, session_filter="near")
+    # A post-filter over the global top 2 would find nothing: every closer memory is in "far"
+    assert [item.text for item in found] == ["mine 0", "mine 1"]
+
+    found = sessions.retrieve("query", top_k=5, session_filter="near")
+    assert [item.text for item in found] == ["mine 0", "mine 1", "mine 2"]
+
+
+def test_filters_combine(sessions):
+    assert [i.text for i in sessions.retrieve("query", top_k=3, type_filter="tool_output", tag_filter=["add"])] == [
+        "mine 0", "mine 1", "mine 2"
+    ]
+    assert sessions.retrieve("query", top_k=3, session_filter="far", tag_filter=["add"]) == []
+    assert sessions.retrieve("query", top_k=3, session_filter="nobody") == []
+    assert len(sessions.retrieve("query", top_k=3, type_filter="all")) == 3
+
+
+def test_rebuilds_read_vectors_back_from_the_index(embedder):
+    texts = [f"item {i}" for i in range(60)]
+    memory = MemoryManager("http://unused", use_cache=False, index_config={"type": "hnsw", "min_vectors": 20})
+    memory.bulk_add([MemoryItem(text=text) for text in texts[:30]])
+    memory.wait_for_rebuild()
+    assert type(memory.index).__name__ == "IndexHNSWFlat"
+
+    # Switching kinds rebuilds from the HNSW index's own storage; no side copy of the vectors is kept
+    memory.index_config["type"] = "ivf_flat"
+    memory.bulk_add([MemoryItem(text=text) for text in texts[30:]])
+    memory.wait_for_rebuild()
+    assert type(memory.index).__name__ == "IndexIVFFlat"
+    np.testing.assert_array_equal(memory._all_vectors(), np.stack([embedder.vector(text) for text in texts]))
+    assert not hasattr(memory, "embeddings")
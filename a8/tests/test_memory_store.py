@@ -0,0 +1,92 @@
+import faiss
+import numpy as np
+
+from modules import memory
+from modules.memory import MemoryItem, MemoryManager
+from modules.memory_store import MemoryStore
+
+
+def stored_items(n, offset=0):
+    return [{"text": f"t{offset + i}", "session_id": "s", "type": "fact"} for i in range(n)]
+
+
+def test_rows_round_trip(tmp_path, vectors):
+    store = MemoryStore(tmp_path)
+    data = vectors(5, dim=8)
+    with store.transaction():
+        store.insert(0, stored_items(5), data)
+    assert store.count() == 5
+    assert [item["text"] for item in store.items(1, 3)] == ["t1", "t2"]
+
+    items, stacked = store.rows(3)
+    assert [item["text"] for item in items] == ["t3", "t4"]
+    np.testing.assert_array_equal(stacked, data[3:])
+    assert store.rows(5) == ([], None)
+    store.close()
+
+
+def test_failed_transaction_rolls_back(tmp_path, vectors):
+    store = MemoryStore(tmp_path)
+    try:
+        with store.transaction():
+            store.insert(0, stored_items(2), vectors(2, dim=8))
+            raise RuntimeError("embedding failed")
+    except RuntimeError:
+        pass
+    assert store.count() == 0
+    store.close()
+
+
+def test_index_checkpoint_round_trip(tmp_path, vectors):
+    store = MemoryStore(tmp_path, checkpoint_every=3)
+    assert store.load_index() is None
+
+    index = faiss.IndexFlatL2(8)
+    index.add(vectors(2, dim=8))
+    store.maybe_checkpoint(index, 2)
+    assert not store.index_path.exists()
+    store.maybe_checkpoint(index, 1)
+    assert store.index_path.exists()
+
+    loaded = store.load_index()
+    assert loaded.ntotal == 2
+    loaded.add(vectors(1, dim=8, seed=1))  # a loaded checkpoint keeps accepting adds
+    assert loaded.ntotal == 3
+    store.close()
+
+
+def test_corrupt_checkpoint_is_ignored(tmp_path):
+    store = MemoryStore(tmp_path)
+    store.index_path.write_bytes(b"not an index")
+    assert store.load_index() is None
+    store.close()
+
+
+def test_manager_reloads_without_re_embedding(tmp_path, monkeypatch, vectors):
+    table = dict(zip([f"t{i}" for i in range(6)], vectors(6, dim=8)))
+    calls = []
+
+    def embed(self, texts):
+        calls.extend(texts)
+        return np.stack([table[text] for text in texts])
+
+    monkeypatch.setattr(MemoryManager, "_request_embeddings", embed)
+
+    def open_manager():
+        return MemoryManager("http://unused", use_cache=False, store=MemoryStore(tmp_path, checkpoint_every=2))
+
+    first = open_manager()
+    first.bulk_add([MemoryItem(text=f"t{i}", session_id="A") for i in range(3)])  # checkpointed
+    first.add(MemoryItem(text="t3", session_id="B"))  # only in SQLite until the next checkpoint
+
+    second = open_manager()  # e.g. another process, while the first is still running
+    assert second.store.load_index().ntotal == 3
+    assert [item.text for item in second.data] == ["t0", "t1", "t2", "t3"]
+    assert second.index.ntotal == 4
+    first.close()
+    calls.clear()
+    monkeypatch.setattr(memory.MemoryManager, "_get_embedding", lambda self, text: table[text])
+    assert [item.text for item in second.retrieve("t3", top_k=1)] == ["t3"]
+    assert [item.text for item in second.retrieve("t3", top_k=1, session_filter="A")] != ["t3"]
+    assert calls == []
+    second.close()
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from modules.model_router import LatencyTracker, ModelRouter
+
+
+class Backend:
+    """Stands in for ModelManager: replies after `delay` seconds, or raises `error`."""
+
+    def __init__(self, key: str, delay: float = 0.0, error: Exception = None):
+        self.key = key
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    def lookup_cache(self, prompt, role=None):
+        return None
+
+    async def generate_text(self, prompt, role=None, check_cache=True):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return f"{self.key}: {prompt}"
+
+
+@pytest.fixture
+def router():
+    def make(*backends: Backend, hedge: bool = False, hedge_after: float = 0.1) -> ModelRouter:
+        router = ModelRouter()
+        router.routes = {"decision": [b.key for b in backends]}
+        router.hedge = hedge
+        router.hedge_after = hedge_after
+        router.min_samples = 5
+        for backend in backends:
+            router.managers[backend.key] = backend
+            router.latency[backend.key] = LatencyTracker()
+            router.first_chunk[backend.key] = LatencyTracker()
+        return router
+    return make
+
+
+def test_falls_back_to_the_next_backend(router):
+    primary, fallback = Backend("gemini", error=RuntimeError("503")), Backend("phi4")
+    r = router(primary, fallback)
+    assert asyncio.run(r.generate_text("hi", role="decision")) == "phi4: hi"
+    assert r.latency["gemini"].failures == 1
+    assert len(r.latency["phi4"].samples) == 1
+
+
+def test_failing_backend_is_tried_last_while_cooling_down(router):
+    r = router(Backend("gemini"), Backend("phi4"))
+    for _ in range(r.max_failures):
+        r.latency["gemini"].record_failure()
+    assert r.candidates("decision") == ["phi4", "gemini"]
+    r.latency["gemini"].last_failure -= r.failure_cooldown
+    assert r.candidates("decision") == ["gemini", "phi4"]
+
+
+def test_unrouted_roles_use_the_default_backend(router):
+    r = router(Backend("gemini"))
+    assert r.candidates("perception") == [r.default_key]
+
+
+def test_hedge_starts_the_next_backend_after_the_budget(router):
+    slow, fast = Backend("gemini", delay=5), Backend("phi4", delay=0.01)
+    r = router(slow, fast, hedge=True, hedge_after=0.1)
+
+    async def scenario():
+        reply = await r.generate_text("hi", role="decision")
+        await asyncio.sleep(0)  # let the cancelled loser unwind
+        return reply
+
+    assert asyncio.run(scenario()) == "phi4: hi"
+    assert slow.cancelled == 1
+    # The cancelled attempt still counts, at no less than its budget, so p95 cannot only shrink
+    assert list(r.latency["gemini"].samples) == [pytest.approx(0.1, abs=0.05)]
+    assert r.latency["gemini"].samples[0] >= 0.1
+    assert r.latency["gemini"].failures == 0
+
+
+def test_no_hedge_when_the_first_backend_answers_in_time(router):
+    first, second = Backend("gemini", delay=0.01), Backend("phi4")
+    r = router(first, second, hedge=True, hedge_after=1.0)
+    assert asyncio.run(r.generate_text("hi", role="decision")) == "gemini: hi"
+    assert second.calls == 0
+
+
+def test_hedge_budget_follows_observed_p95(router):
+    r = router(Backend("gemini"), Backend("phi4"), hedge_after=8.0)
+    for seconds in (1.0, 1.0, 1.0, 1.0):
+        r.latency["gemini"].record(seconds)
+    assert r.hedge_budget("gemini") == 8.0  # not enough history yet
+    r.latency["gemini"].record(2.0)
+    assert r.hedge_budget("gemini") == 2.0
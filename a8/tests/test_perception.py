@@ -0,0 +1,33 @@
+from modules.perception import PerceptionResult, perception_is_stale, carry_perception
+
+
+def perception(**fields) -> PerceptionResult:
+    return PerceptionResult(**{"user_input": "what is 2+2", "intent": "add numbers", **fields})
+
+
+def test_missing_perception_is_stale():
+    assert perception_is_stale(None, [])
+    assert perception_is_stale(perception(intent=None), [("add", {}, "4")])
+
+
+def test_useful_results_keep_perception():
+    assert not perception_is_stale(perception(), [("add", {"a": 2, "b": 2}, "4"), ("search", {}, "Gensol is ...")])
+
+
+def test_empty_or_failed_results_are_stale():
+    assert perception_is_stale(perception(), [("add", {}, "4"), ("search", {}, "  ")])
+    assert perception_is_stale(perception(), [("search", {}, "ERROR: connection refused")])
+    assert perception_is_stale(perception(), [("search", {}, "No results found for query")])
+
+
+def test_only_the_start_of_a_result_is_checked():
+    assert not perception_is_stale(perception(), [("search", {}, "x" * 300 + " not found")])
+
+
+def test_carry_perception_drops_used_hint():
+    carried = carry_perception(perception(tool_hint="add", entities=["2"]), "next step", [("add", {}, "4")])
+    assert carried.user_input == "next step"
+    assert carried.intent == "add numbers"
+    assert carried.entities == ["2"]
+    assert carried.tool_hint is None
+    assert carry_perception(perception(tool_hint="search"), "next", [("add", {}, "4")]).tool_hint == "search"
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import httpx
+
+from modules.rate_limit import RateLimiter, TokenBucket, backoff_delay, get_limiter, is_rate_limited
+
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(60)  # one per second
+    now = bucket.updated
+    assert bucket.wait_time(60, now) == 0
+    bucket.take(60)
+    assert bucket.wait_time(1, now) == 1.0
+    assert bucket.wait_time(1, now + 0.5) == 0.5
+    assert bucket.wait_time(1000, now) == 60.0  # oversized requests wait for a full bucket
+
+
+def test_limiter_without_limits_admits_immediately():
+    limiter = RateLimiter()
+
+    async def burst():
+        await asyncio.gather(*(limiter.admit("x" * 1000) for _ in range(20)))
+
+    started = time.monotonic()
+    asyncio.run(burst())
+    assert time.monotonic() - started < 0.1
+    assert limiter.stats["admitted"] == 20
+    assert limiter.stats["queued"] == 0
+
+
+def test_limiter_queues_over_rpm():
+    limiter = RateLimiter(rpm=600)  # ten per second, bucket of 600
+    limiter.requests.tokens = 2
+
+    async def burst():
+        await asyncio.gather(*(limiter.acquire() for _ in range(4)))
+
+    started = time.monotonic()
+    asyncio.run(burst())
+    elapsed = time.monotonic() - started
+    assert 0.15 <= elapsed < 1.0
+    summary = limiter.summary()
+    assert summary["admitted"] == 4
+    assert summary["queued"] >= 1
+    assert summary["max_queue_depth"] >= 2
+
+
+def test_limiter_counts_prompt_and_output_reserve_against_tpm():
+    limiter = RateLimiter(tpm=6000, output_reserve=100)
+    asyncio.run(limiter.admit("x" * 400))
+    assert round(limiter.tokens.capacity - limiter.tokens.tokens) == 200
+
+
+def test_is_rate_limited():
+    request = httpx.Request("POST", "http://localhost")
+    assert is_rate_limited(httpx.HTTPStatusError("", request=request, response=httpx.Response(429, request=request)))
+    assert not is_rate_limited(httpx.HTTPStatusError("", request=request, response=httpx.Response(500, request=request)))
+
+    class APIError(Exception):
+        code = 429
+
+    assert is_rate_limited(APIError())
+    assert not is_rate_limited(ValueError())
+
+
+def test_backoff_delay_grows_and_is_capped():
+    for attempt in range(4):
+        assert 0.75 * 2 ** attempt <= backoff_delay(attempt, 1.0) <= 1.25 * 2 ** attempt
+    assert backoff_delay(20, 1.0, cap=5.0) <= 5.0 * 1.25
+
+
+def test_get_limiter_is_shared_and_reapplies_changed_config():
+    first = get_limiter("test-model", {"rpm": 10})
+    assert get_limiter("test-model", {"rpm": 10}) is first
+    assert first.tokens is None
+
+    reloaded = get_limiter("test-model", {"rpm": 10, "tpm": 1000, "max_retries": 2})
+    assert reloaded is first
+    assert reloaded.tokens.capacity == 1000
+    assert reloaded.max_retries == 2
@@ -0,0 +1,149 @@
+import asyncio
+import time
+
+import pytest
+
+from core.session import MultiMCP, ServerPool, ServerStartTimeoutError, ToolTimeoutError
+
+SERVER = '''
+import os
+import asyncio
+from mcp.server.fastmcp import FastMCP
+
+mcp = FastMCP("test")
+
+
+@mcp.tool()
+def add(a: int, b: int) -> int:
+    """add"""
+    return a + b
+
+
+@mcp.tool()
+async def sleep(seconds: float) -> str:
+    """sleep"""
+    await asyncio.sleep(seconds)
+    return "done"
+
+
+@mcp.tool()
+async def nap(seconds: float) -> int:
+    """sleep, then report the server's pid"""
+    await asyncio.sleep(seconds)
+    return os.getpid()
+
+
+if __name__ == "__main__":
+    mcp.run(transport="stdio")
+'''
+
+HANGING_SERVER = '''
+import time
+time.sleep(60)  # never answers the MCP handshake
+'''
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / "server.py").write_text(SERVER)
+    (tmp_path / "hang.py").write_text(HANGING_SERVER)
+    return tmp_path
+
+
+def test_tool_call_timeout(server):
+    async def scenario():
+        pool = ServerPool({
+            "script": "server.py",
+            "cwd": str(server),
+            "call_timeout": 30,
+            "tool_timeouts": {"sleep": 0.5},
+        })
+        try:
+            assert (await pool.call_tool("add", {"a": 2, "b": 3})).content[0].text == "5"
+
+            started = time.monotonic()
+            with pytest.raises(ToolTimeoutError) as raised:
+                await pool.call_tool("sleep", {"seconds": 30})
+            assert time.monotonic() - started < 5
+            assert raised.value.tool_name == "sleep"
+
+            # The timed-out session is restarted in the background; the next call still works
+            assert (await pool.call_tool("add", {"a": 1, "b": 1})).content[0].text == "2"
+            assert pool.in_flight == 0
+        finally:
+            await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_timeout_does_not_kill_sibling_calls(server):
+    async def scenario():
+        pool = ServerPool({"script": "server.py", "cwd": str(server), "tool_timeouts": {"sleep": 0.5}})
+        try:
+            first_pid = (await pool.call_tool("nap", {"seconds": 0})).content[0].text
+
+            async def runaway():
+                with pytest.raises(ToolTimeoutError):
+                    await pool.call_tool("sleep", {"seconds": 30})
+
+            async def sibling():
+                await asyncio.sleep(0.1)
+                # Same session, still running when the runaway call times out at 0.5s
+                return await pool.call_tool("nap", {"seconds": 1.5})
+
+            _, result = await asyncio.gather(runaway(), sibling())
+            assert not result.isError
+            assert result.content[0].text == first_pid
+
+            # New calls go to a replacement session
+            assert (await pool.call_tool("nap", {"seconds": 0})).content[0].text != first_pid
+        finally:
+            await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_startup_timeout_bounds_discovery(server):
+    async def scenario():
+        stuck = MultiMCP([{"id": "stuck", "script": "hang.py", "cwd": str(server), "startup_timeout": 1}], use_cache=False)
+        started = time.monotonic()
+        await stuck.initialize()
+        # The stuck server is stopped in the background, not awaited on the startup path
+        assert time.monotonic() - started < 1.5
+        assert stuck.tool_map == {}
+        await stuck.shutdown()
+        assert not any(pool.running for pool in stuck.pools.values())
+
+        mcp = MultiMCP(
+            [
+                {"id": "stuck", "script": "hang.py", "cwd": str(server), "startup_timeout": 1},
+                {"id": "ok", "script": "server.py", "cwd": str(server), "startup_timeout": 30},
+            ],
+            use_cache=False,
+        )
+        await mcp.initialize()
+        try:
+            assert sorted(mcp.tool_map) == ["add", "nap", "sleep"]
+            assert await mcp.call_tool("add", {"a": 2, "b": 2})
+        finally:
+            await mcp.shutdown()
+        assert not any(pool.running for pool in mcp.pools.values())
+
+    asyncio.run(scenario())
+
+
+def test_lazy_start_is_bounded_by_startup_timeout(server):
+    async def scenario():
+        # A server skipped at startup (e.g. its tools came from the catalog cache) that hangs on its first call
+        pool = ServerPool({"script": "hang.py", "cwd": str(server), "call_timeout": 1, "startup_timeout": 1})
+        started = time.monotonic()
+        with pytest.raises(ServerStartTimeoutError) as raised:
+            await pool.call_tool("add", {"a": 1, "b": 2})
+        assert time.monotonic() - started < 1.5
+        assert isinstance(raised.value, ToolTimeoutError)  # MultiMCP turns it into a structured timeout result
+        assert pool.in_flight == 0
+        await pool.close()
+        assert not pool.running
+
+    asyncio.run(scenario())
+
@@ -0,0 +1,172 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core import strategy
+from modules.memory import MemoryItem
+from modules.perception import PerceptionResult
+
+TOOLS = [
+    SimpleNamespace(name="add", description="Add two numbers"),
+    SimpleNamespace(name="search_documents", description="Search local documents"),
+]
+
+
+def perception(tool_hint=None) -> PerceptionResult:
+    return PerceptionResult(user_input="what is 2+2", intent="add numbers", tool_hint=tool_hint)
+
+
+class Planner:
+    """Stands in for generate_plan: answers by prompt variant and records every request."""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.requests = []
+
+    async def __call__(self, perception, memory_items, tool_descriptions, **_):
+        request = (tool_descriptions, tuple(m.text for m in memory_items))
+        self.requests.append(request)
+        await asyncio.sleep(0)
+        return self.answer(*request)
+
+
+@pytest.fixture
+def planner(monkeypatch):
+    def install(answer) -> Planner:
+        fake = Planner(answer)
+        monkeypatch.setattr(strategy, "generate_plan", fake)
+        return fake
+    return install
+
+
+def test_score_plan_prefers_a_concrete_answer():
+    answer = strategy.score_plan("FINAL_ANSWER: [4]", TOOLS)
+    call = strategy.score_plan('FUNCTION_CALL: add|{"a": 2, "b": 2}', TOOLS)
+    assert answer > call
+    assert call > strategy.score_plan('FUNCTION_CALL: multiply|{"a": 2}', TOOLS)
+    assert strategy.score_plan("FINAL_ANSWER: [unknown]", TOOLS) == 0
+    assert strategy.score_plan("FUNCTION_CALL: add|{broken", TOOLS) == 0
+
+
+def test_explore_all_picks_the_answer_over_another_call(planner):
+    def answer(tools, memory):
+        return "FINAL_ANSWER: [4]" if memory else 'FUNCTION_CALL: add|{"a": 2, "b": 2}'
+
+    fake = planner(answer)
+    memory = [MemoryItem(text="add({'a': 2, 'b': 2}) → 4"), MemoryItem(text="older result")]
+    plan = asyncio.run(strategy.explore_all(perception("add"), memory, TOOLS, step_num=2, max_steps=5, width=4))
+    assert plan == "FINAL_ANSWER: [4]"
+    assert len(fake.requests) == 4
+
+
+def test_explore_all_ties_go_to_the_focused_variant(planner):
+    fake = planner(lambda tools, memory: 'FUNCTION_CALL: add|{"a": 2, "b": 2}' if "search" not in tools else
+                   'FUNCTION_CALL: search_documents|{"query": "2+2"}')
+    plan = asyncio.run(strategy.explore_all(perception("add"), [], TOOLS, step_num=1, max_steps=5, width=2))
+    assert plan.startswith("FUNCTION_CALL: add")
+    assert [tools for tools, _ in fake.requests] == ["- add: Add two numbers", strategy.summarize_tools(TOOLS)]
+
+
+@pytest.mark.parametrize("hint", [None, "no_such_tool"])
+def test_explore_all_sends_each_distinct_prompt_once(planner, hint):
+    fake = planner(lambda tools, memory: "FINAL_ANSWER: [4]")
+    memory = [MemoryItem(text="one"), MemoryItem(text="two")]
+    asyncio.run(strategy.explore_all(perception(hint), memory, TOOLS, step_num=1, max_steps=5, width=4))
+    # Without a usable hint the filtered and full tool lists are the same
+    assert len(fake.requests) == len(set(fake.requests)) == 3
+
+    fake.requests.clear()
+    asyncio.run(strategy.explore_all(perception(hint), [], TOOLS, step_num=1, max_steps=5, width=4))
+    assert len(fake.requests) == 1
+
+
+def context(strategy_type: str, retry_concurrent: bool = False):
+    profile = SimpleNamespace(
+        strategy=strategy_type,
+        max_steps=5,
+        max_parallel_calls=1,
+        explore_width=3,
+        retry_concurrent=retry_concurrent,
+    )
+    return SimpleNamespace(agent_profile=profile, step=0)
+
+
+FILTERED = "- add: Add two numbers"
+
+
+def unknown_when_filtered(tools, memory):
+    return "FINAL_ANSWER: [unknown]" if tools == FILTERED else 'FUNCTION_CALL: search_documents|{"query": "x"}'
+
+
+def decide(ctx, hint="add"):
+    return strategy.decide_next_action(ctx, perception(hint), [], TOOLS)
+
+
+@pytest.mark.parametrize("retry_concurrent", [False, True])
+def test_retry_once_falls_back_to_all_tools(planner, retry_concurrent):
+    fake = planner(unknown_when_filtered)
+    plan = asyncio.run(decide(context("retry_once", retry_concurrent)))
+    assert plan.startswith("FUNCTION_CALL: search_documents")
+    assert [tools for tools, _ in fake.requests] == [FILTERED, strategy.summarize_tools(TOOLS)]
+
+
+def test_retry_once_keeps_a_usable_filtered_plan(planner):
+    fake = planner(lambda tools, memory: 'FUNCTION_CALL: add|{"a": 2, "b": 2}')
+    assert asyncio.run(decide(context("retry_once"))).startswith("FUNCTION_CALL: add")
+    assert len(fake.requests) == 1
+
+
+def test_no_retry_when_the_hint_did_not_narrow_the_tools(planner):
+    fake = planner(lambda tools, memory: "FINAL_ANSWER: [unknown]")
+    assert asyncio.run(decide(context("retry_once"), hint=None)) == "FINAL_ANSWER: [unknown]"
+    assert asyncio.run(decide(context("conservative"))) == "FINAL_ANSWER: [unknown]"
+    assert len(fake.requests) == 2
+
+
+def test_retry_concurrent_cancels_the_unneeded_plan(monkeypatch):
+    cancelled = []
+
+    async def generate_plan(perception, memory_items, tool_descriptions, **_):
+        try:
+            await asyncio.sleep(0.05 if tool_descriptions == FILTERED else 10)
+        except asyncio.CancelledError:
+            cancelled.append(tool_descriptions)
+            raise
+        return 'FUNCTION_CALL: add|{"a": 2, "b": 2}'
+
+    monkeypatch.setattr(strategy, "generate_plan", generate_plan)
+
+    async def scenario():
+        plan = await decide(context("retry_once", retry_concurrent=True))
+        await asyncio.sleep(0)
+        return plan
+
+    assert asyncio.run(scenario()).startswith("FUNCTION_CALL: add")
+    assert cancelled == [strategy.summarize_tools(TOOLS)]
+
+
+def test_retry_concurrent_cancels_both_plans_with_the_step(monkeypatch):
+    started, cancelled = [], []
+
+    async def generate_plan(perception, memory_items, tool_descriptions, **_):
+        started.append(tool_descriptions)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(tool_descriptions)
+            raise
+
+    monkeypatch.setattr(strategy, "generate_plan", generate_plan)
+
+    async def scenario():
+        step = asyncio.create_task(decide(context("retry_once", retry_concurrent=True)))
+        await asyncio.sleep(0.05)
+        step.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await step
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert len(started) == 2
+    assert sorted(cancelled) == sorted(started)